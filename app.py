@@ -1,15 +1,43 @@
+import io
 import os
+import sys
+import gzip
 import json
+import time
+import random
+import shutil
+import pstats
+import cProfile
+import tempfile
+import threading
+import base64
+import hmac
+import struct
+import hashlib
+import re
+import unicodedata
 import asyncio
+import logging
+import traceback
+import contextvars
+import signal
+from collections import Counter, deque
 from datetime import datetime, timedelta, timezone
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Tuple, Optional
 
+import httpx
+import tornado.web
+import tornado.httpserver
+import segno
 from dotenv import load_dotenv
+from psycopg import sql
 from psycopg_pool import AsyncConnectionPool
 
 from telegram import (
+    Bot,
+    CallbackQuery,
     Update,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
@@ -19,13 +47,15 @@ from telegram import (
     ReplyKeyboardRemove,
 )
 from telegram.constants import ChatAction
-from telegram.error import TimedOut, NetworkError
+from telegram.error import TimedOut, NetworkError, BadRequest
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
+    TypeHandler,
     filters,
 )
 
@@ -34,16 +64,37 @@ from telegram.ext import (
 # =========================
 load_dotenv()
 
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    level=logging.INFO,
+)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+log = logging.getLogger("bot")
+
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 USE_WEBHOOK = os.getenv("USE_WEBHOOK", "true").lower() == "true"
 PORT = int(os.getenv("PORT", "8080"))
 WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "")
-WEBHOOK_PATH = f"/webhook/{BOT_TOKEN}" if BOT_TOKEN else "/webhook"
-WEBHOOK_URL = f"{WEBHOOK_HOST}{WEBHOOK_PATH}" if WEBHOOK_HOST else ""
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 DB_POOL: AsyncConnectionPool | None = None
 
+# HTTP saliente: un pool por tipo de tráfico para que las cargas pesadas y los
+# envíos masivos no agoten las conexiones de las respuestas interactivas.
+HTTP_POOL_INTERACTIVO = int(os.getenv("HTTP_POOL_INTERACTIVO", "32"))
+HTTP_POOL_CARGAS = int(os.getenv("HTTP_POOL_CARGAS", "4"))
+HTTP_POOL_DIFUSION = int(os.getenv("HTTP_POOL_DIFUSION", "8"))
+HTTP_KEEPALIVE_SECS = float(os.getenv("HTTP_KEEPALIVE_SECS", "30"))
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "32"))
+# Bots de subidas y de difusión por token (mismo token, cliente HTTP compartido por tipo de tráfico)
+BOTS_CARGAS: Dict[str, Bot] = {}
+BOTS_DIFUSION: Dict[str, Bot] = {}
+
+# Varios eventos en un proceso: data/eventos.json (ver sección EVENTOS). Sin ese
+# archivo hay un único evento armado con las variables de entorno de abajo.
+EVENTOS_JSON = Path(os.getenv("EVENTOS_JSON", str(Path(__file__).parent / "data" / "eventos.json")))
+EVENTO_ID = os.getenv("EVENTO_ID", "bootcamp-2025-bogota")
+
 LAUNCH_DATE_STR = os.getenv("LAUNCH_DATE", "")
 PRELAUNCH_DAYS = int(os.getenv("PRELAUNCH_DAYS", "2"))
 PRELAUNCH_MESSAGE = os.getenv(
@@ -52,13 +103,16 @@ PRELAUNCH_MESSAGE = os.getenv(
     "⏳ Vuelve pronto y usa /start para comenzar. 🙌"
 )
 
-# WIFI
+# WIFI (valores por defecto; el catálogo puede sobrescribirlos)
 WIFI_SSID = os.getenv("WIFI_SSID", "Club_Nogal")
-WIFI_MSG = os.getenv(
+WIFI_MSG_PLANTILLA = os.getenv(
     "WIFI_MESSAGE",
     "📶 *Wi-Fi del evento*\n\n• **Nombre de red (SSID):** `{ssid}`\n"
     "• *La red es abierta (no necesita clave).*"
-).replace("{ssid}", WIFI_SSID)
+)
+
+# Catálogo de contenido (presentadores, materiales, enlaces, Wi-Fi)
+CATALOGO_WATCH_SECS = int(os.getenv("CATALOGO_WATCH_SECS", "30"))
 
 # --- ADMINS (incluye el nuevo 7724870185) ---
 ADMINS: set[int] = {
@@ -69,12 +123,18 @@ ADMINS: set[int] = {
     7724870185,  # NUEVO
 }
 
+# --- CHECK-IN EN LA PUERTA (QR firmado) ---
+CHECKIN_SECRET = os.getenv("CHECKIN_SECRET", "").encode("utf-8")
+STAFF: set[int] = {
+    int(x) for x in os.getenv("CHECKIN_STAFF", "").replace(" ", "").split(",") if x
+}
+
 # =========================
 # TEXTOS / RECURSOS
 # =========================
 NOMBRE_EVENTO = "Bootcamp 2025 Bogotá"
 BIENVENIDA = (
-    f"🎉 ¡Bienvenido/a al {NOMBRE_EVENTO}! 🎉\n\n"
+    "🎉 ¡Bienvenido/a al {evento}! 🎉\n\n"
     "Has sido validado correctamente.\n"
     "Usa el menú para navegar."
 )
@@ -97,10 +157,7 @@ UBICACION_URL = "https://maps.app.goo.gl/GS2k9sL38zchErH89"
 EXNESS_ACCOUNT_URL = "https://one.exnessonelink.com/a/s3wj0b5qry"
 EXNESS_COPY_URL = "https://social-trading.exness.com/strategy/227834645/a/s3wj0b5qry?sharer=trader"
 
-ENLACES_CONEXION: Dict[str, str] = {
-    "Bootcamp Día 1": "https://us06web.zoom.us/j/85908132642?pwd=ItdvVDASOYRilJHB43c2Naz0eS76XJ.1",
-    "Bootcamp Día 2": "https://us06web.zoom.us/j/84348314641?pwd=ymlDnmB2Cw2s2vGcNbIrFVdEnMRIXg.1",
-}
+CATALOGO_JSON = Path(os.getenv("CATALOGO_JSON", str(DATA_DIR / "catalogo.json")))
 
 # =========================
 # BASE LOCAL (JSON o embebida)
@@ -121,19 +178,36 @@ def es_cedula(s: str) -> bool:
     return s2.isdigit()
 
 def normaliza(s: str) -> str:
-    return (s or "").strip().lower()
+    c = (s or "").strip().lower()
+    # Cédulas: solo dígitos, así "1.040.181", "1 040 181" y "1040181" son la misma clave
+    return c.replace(".", "").replace(" ", "") if es_cedula(c) else c
 
-def cargar_base_local() -> Dict[str, str]:
-    if USUARIOS_JSON.exists():
+def cargar_base_local(ruta: Path = USUARIOS_JSON) -> Dict[str, str]:
+    if ruta.exists():
         try:
-            raw = json.loads(USUARIOS_JSON.read_text(encoding="utf-8"))
+            raw = json.loads(ruta.read_text(encoding="utf-8"))
             if isinstance(raw, dict):
                 return {normaliza(k): v for k, v in raw.items()}
         except Exception:
             pass
     return {normaliza(k): v for k, v in USUARIOS_EMBEBIDOS.items()}
 
-BASE_LOCAL = cargar_base_local()
+@dataclass(frozen=True)
+class Roster:
+    """Base local indexada: clave -> nombre y nombre -> (cédula, correo), ambos O(1)."""
+    claves: Dict[str, str]
+    contacto: Dict[str, Tuple[Optional[str], Optional[str]]]
+
+def indexar_roster(base: Dict[str, str]) -> Roster:
+    contacto: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    for k, nombre in base.items():
+        cedula, correo = contacto.get(nombre, (None, None))
+        if not cedula and es_cedula(k):
+            cedula = k
+        if not correo and es_correo(k):
+            correo = k
+        contacto[nombre] = (cedula, correo)
+    return Roster(claves=base, contacto=contacto)
 
 def parse_fecha(date_str: str):
     try:
@@ -145,91 +219,22 @@ def parse_fecha(date_str: str):
 def hoy_utc() -> datetime:
     return datetime.now(timezone.utc)
 
-def esta_en_prelanzamiento() -> tuple[bool, str]:
-    launch_dt = parse_fecha(LAUNCH_DATE_STR)
+def esta_en_prelanzamiento(ev: "Evento") -> tuple[bool, str]:
+    launch_dt = parse_fecha(ev.launch_date)
     if not launch_dt:
         return (False, "")
-    habilita_dt = launch_dt - timedelta(days=PRELAUNCH_DAYS)
+    habilita_dt = launch_dt - timedelta(days=ev.prelaunch_days)
     now = hoy_utc()
     if now < habilita_dt:
         dias = (habilita_dt.date() - now.date()).days
         msg = (
             f"✨ El bot estará disponible 🔥 el día del evento.\n\n"
             f"⏳ Faltan {dias} días, vuelve pronto. 🙌\n\n"
-            f"{PRELAUNCH_MESSAGE}"
+            f"{ev.prelaunch_message}"
         )
         return (True, msg)
     return (False, "")
 
-# =========================
-# MATERIAL DE APOYO (igual al primero)
-# =========================
-PRESENTADORES = [
-    ("p1", "Juan Pablo Vieira"),
-    ("p2", "Andrés Durán"),
-    ("p3", "Carlos Andrés Pérez"),
-    ("p4", "Jorge Mario Rubio"),
-    ("p5", "Jair Viana"),
-]
-
-# Estructura: MATERIALES[pid]["docs"][nombre] = Path(...)
-MATERIALES: Dict[str, Dict[str, Dict[str, Path]]] = {
-    "p1": {"videos": {}, "docs": {}},
-    "p2": {"videos": {}, "docs": {}},
-    "p3": {"videos": {}, "docs": {}},
-    "p4": {"videos": {}, "docs": {}},
-    "p5": {"videos": {}, "docs": {}},
-}
-# Ejemplo: agrega aquí tus archivos (debe existir el fichero en data/docs/)
-# MATERIALES["p2"]["docs"]["VALORACIÓN RAPIDA JP TACTICAL"] = DOCS_DIR / "VALORACIÓN RAPIDA JP TACTICAL.xlsx"
-# MATERIALES["p2"]["docs"]["VALORACIÓN RAPIDA JP TACTICAL DIDACTICA"] = DOCS_DIR / "VALORACIÓN RAPIDA- DIDACTICA-2.xlsx"
-
-# Videos por presentador (URLs)
-VIDEO_LINKS: Dict[str, Dict[str, str]] = {
-    "p1": {
-        "Crear Cuenta en Interactive Brokers": "https://drive.google.com/file/d/1thOot6PZdxLgutH3c3JuCrIwXwRGcxeb/view?usp=sharing",
-        "Crear Cuenta en TRII": "https://drive.google.com/file/d/1thOot6PZdxLgutH3c3JuCrIwXwRGcxeb/view?usp=sharing",
-    },
-    "p2": {
-        # "DATOS DE EMPRESAS Y MACRO": "https://drive.google.com/file/d/1S-LncN3dd3eYBBCO_YgYuv5n6d2DSGAM/view?usp=sharing",
-        # "DATOS DE EMPRESAS": "https://drive.google.com/file/d/1Yo1CxNipafXdbcoXK6ahpGgaHdJqdbzj/view?usp=sharing",
-        # "FRED": "https://drive.google.com/file/d/12SRmvSbdhrS0qeM4dFE1EMSkScH4hKcL/view?usp=sharing",
-        # "HERRAMIENTA D.O.O.R": "https://drive.google.com/file/d/1zwejfDpdC7Z0CVsCb4t0UqQD0yqdPBBe/view?usp=sharing",
-        # "MORNINGSTAR": "https://drive.google.com/file/d/1POiz8YG7xYZpjxaBZ7YiZqmI7RpCQgLa/view?usp=sharing",
-        # "MOVIMIENTOS DE SENADORES USA": "https://drive.google.com/file/d/1zGIZWRRs3EiMAv-i9DDe5N57XxYWkqx5/view?usp=sharing",
-        # "PAGINA MORDOR INTELLIGENCE": "https://drive.google.com/file/d/17HMRzdBHknyxLeoB7JA0V9h-gtQrgZX4/view?usp=sharing",
-        # "PORTAFOLIO GRANDES INVERSORES": "https://drive.google.com/file/d/1-qcP4LNAlCaqajgepQYcREC8fdzwpgY-/view?usp=sharing",
-        # "SCREENER, MAPS Y DATOS": "https://drive.google.com/file/d/1Mn_SmvqXEijzAOPoNtsnoW3mWksqPdTl/view?usp=sharing",
-        # "SEC": "https://drive.google.com/file/d/1OwIZ_Bk94RHjQZf0zmxtlH38frrxzb70/view?usp=sharing",
-        # "VALORACIÓN COMPAÑIA": "https://drive.google.com/file/d/1mqG03xZB8urE7_VA1a8YcRO4nalxnSWD/view?usp=sharing",
-    },
-    "p3": {},
-    "p4": {},
-    "p5": {},
-}
-
-ENLACES_POR_PRESENTADOR: Dict[str, Dict[str, str]] = {
-    "p1": {"Web": "https://ttrading.co", "YouTube": "https://www.youtube.com/@JPTacticalTrading"},
-    "p2": {
-        "Instagram Andrés Durán": "https://www.instagram.com/duranwealth?igsh=aTdjYzQ5eGdtanI=",
-        # "FRED": "https://fred.stlouisfed.org/",
-        # "MACRO TRENDS": "https://www.macrotrends.net/",
-        # "MORNINGSTAR": "https://www.morningstar.com/",
-        # "Web": "https://ttrading.co",
-        # "YouTube": "https://www.youtube.com/@JPTacticalTrading",
-    },
-    "p3": {"Web": "https://ttrading.co", "YouTube": "https://www.youtube.com/@JPTacticalTrading"},
-    "p4": {
-        "Contactanos": "wa.me/message/KMRACEVS2P6GJ1",
-        "Instagram Ps. Jorge Mario Rubio": "https://www.instagram.com/tupsicologoencasa?igsh=eThhdW9lamNxMmIy",
-    },
-    "p5": {
-        "Instagram Libertank": "https://www.instagram.com/libertank?igsh=MTV2aXVtd3JydGxuZA==",
-        "Instagram Jair Viana": "https://www.instagram.com/jair.viana/",
-        "Web": "https://www.instagram.com/libertank?igsh=MTV2aXVtd3JydGxuZA==",
-    },
-}
-
 # =========================
 # UI / MENÚS
 # =========================
@@ -246,9 +251,7 @@ def principal_inline() -> InlineKeyboardMarkup:
 
 
 def presentadores_keyboard(prefix: str) -> InlineKeyboardMarkup:
-    rows = [[InlineKeyboardButton(nombre, callback_data=f"{prefix}:{pid}")] for pid, nombre in PRESENTADORES]
-    rows.append([InlineKeyboardButton("⬅️ Volver", callback_data="volver_menu_principal")])
-    return InlineKeyboardMarkup(rows)
+    return evento_actual().catalogo.teclado(f"pres:{prefix}")
 
 def material_presentador_menu(pid: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
@@ -258,18 +261,11 @@ def material_presentador_menu(pid: str) -> InlineKeyboardMarkup:
         [InlineKeyboardButton("🏠 Menú principal", callback_data="volver_menu_principal")],
     ])
 
-def lista_archivos_inline(diccionario: Dict[str, Path], prefix: str, pid: str) -> InlineKeyboardMarkup:
-    rows = [[InlineKeyboardButton(nombre, callback_data=f"{prefix}:{pid}:{nombre}")]
-            for nombre in diccionario.keys()]
-    rows.append([InlineKeyboardButton("⬅️ Volver", callback_data=f"mat_pres:{pid}")])
-    return InlineKeyboardMarkup(rows)
+def lista_archivos_inline(pid: str) -> InlineKeyboardMarkup:
+    return evento_actual().catalogo.teclado(f"docs:{pid}")
 
 def lista_video_links_inline(pid: str) -> InlineKeyboardMarkup:
-    enlaces = VIDEO_LINKS.get(pid, {})
-    rows = [[InlineKeyboardButton(nombre, url=url)] for nombre, url in enlaces.items()]
-    rows.append([InlineKeyboardButton("⬅️ Volver", callback_data=f"mat_pres:{pid}")])
-    rows.append([InlineKeyboardButton("🏠 Menú principal", callback_data="volver_menu_principal")])
-    return InlineKeyboardMarkup(rows)
+    return evento_actual().catalogo.teclado(f"videos:{pid}")
 
 def enlaces_inline_general() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
@@ -280,11 +276,10 @@ def enlaces_inline_general() -> InlineKeyboardMarkup:
 
 
 def enlaces_presentador_lista(pid: str) -> InlineKeyboardMarkup:
-    enlaces = ENLACES_POR_PRESENTADOR.get(pid, {})
-    rows = [[InlineKeyboardButton(nombre, url=url)] for nombre, url in enlaces.items()]
-    rows.append([InlineKeyboardButton("⬅️ Elegir otro presentador", callback_data="enlaces_por_presentador")])
-    rows.append([InlineKeyboardButton("🏠 Menú principal", callback_data="volver_menu_principal")])
-    return InlineKeyboardMarkup(rows)
+    return evento_actual().catalogo.teclado(f"links:{pid}")
+
+def conexiones_inline() -> InlineKeyboardMarkup:
+    return evento_actual().catalogo.teclado("conexion")
 
 def ubicacion_inline() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
@@ -316,6 +311,371 @@ def bottom_keyboard() -> ReplyKeyboardMarkup:
         is_persistent=True,
     )
 
+# =========================
+# CATÁLOGO (JSON recargable con /reload)
+# =========================
+# El contenido que cambia durante el evento (presentadores, materiales, enlaces
+# de Zoom, Wi-Fi) vive en data/catalogo.json. Se valida y se compila una sola
+# vez en teclados y textos listos para enviar; los handlers solo hacen lookups.
+# Recargar = construir un Catalogo nuevo fuera del camino de las peticiones y
+# reemplazar la referencia Evento.catalogo en una sola asignación.
+
+@dataclass(frozen=True)
+class Material:
+    id: str
+    pid: str
+    titulo: str
+    ruta: Path
+    es_video: bool
+
+
+@dataclass(frozen=True)
+class Catalogo:
+    version: str
+    presentadores: Tuple[Tuple[str, str], ...]
+    nombres: Dict[str, str]
+    # materiales[pid]["docs" | "videos"] = (Material, ...)
+    materiales: Dict[str, Dict[str, Tuple[Material, ...]]]
+    # archivos[id] = Material; es lo único que viaja en el callback_data ("d:<id>")
+    archivos: Dict[str, Material]
+    video_links: Dict[str, Dict[str, str]]
+    enlaces_por_presentador: Dict[str, Dict[str, str]]
+    enlaces_conexion: Dict[str, str]
+    wifi_msg: str
+    teclados: Dict[str, InlineKeyboardMarkup]
+    mtime: float = 0.0
+
+    def nombre_presentador(self, pid: str) -> str:
+        return self.nombres.get(pid, "Presentador")
+
+    def teclado(self, clave: str) -> InlineKeyboardMarkup:
+        # Un botón viejo (de antes de un /reload) puede apuntar a un pid que ya no existe
+        return self.teclados.get(clave) or TECLADO_SOLO_VOLVER
+
+
+TECLADO_SOLO_VOLVER = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🏠 Menú principal", callback_data="volver_menu_principal")],
+])
+
+
+def _url_boton(url: str) -> str:
+    # Telegram rechaza botones URL sin esquema (p. ej. "wa.me/...")
+    return url if "://" in url else f"https://{url}"
+
+
+def _dict_str(valor, donde: str) -> Dict[str, str]:
+    if not isinstance(valor, dict):
+        raise ValueError(f"{donde}: se esperaba un objeto")
+    for k, v in valor.items():
+        if not isinstance(k, str) or not k.strip():
+            raise ValueError(f"{donde}: hay un título vacío")
+        if not isinstance(v, str) or not v.strip():
+            raise ValueError(f"{donde}[{k!r}]: se esperaba un texto no vacío")
+    return valor
+
+
+def _nfc(s: str) -> str:
+    # macOS guarda los nombres con acentos en NFD; el JSON suele venir en NFC
+    return unicodedata.normalize("NFC", s)
+
+
+def id_material(clave: str) -> str:
+    """ID corto y estable (8 caracteres) derivado de la ruta relativa del archivo."""
+    digest = hashlib.blake2b(clave.encode("utf-8"), digest_size=5).digest()
+    return base64.b32encode(digest).decode("ascii").lower()
+
+
+def indexar_materiales() -> Dict[str, Path]:
+    """Recorre DOCS_DIR y VIDEOS_DIR una sola vez. Devuelve {"docs/<ruta relativa>": Path}."""
+    indice: Dict[str, Path] = {}
+    for raiz in (DOCS_DIR, VIDEOS_DIR):
+        for ruta in raiz.rglob("*"):
+            if ruta.is_file() and not ruta.name.startswith("."):
+                clave = _nfc(f"{raiz.name}/{ruta.relative_to(raiz).as_posix()}")
+                indice[clave] = ruta
+    return indice
+
+
+def validar_catalogo(raw) -> dict:
+    """Valida la estructura del JSON del catálogo. Lanza ValueError con el primer problema."""
+    if not isinstance(raw, dict):
+        raise ValueError("el catálogo debe ser un objeto JSON")
+    if "version" not in raw:
+        raise ValueError("falta 'version'")
+
+    presentadores = raw.get("presentadores")
+    if not isinstance(presentadores, list):
+        raise ValueError("'presentadores' debe ser una lista")
+    pids: list[str] = []
+    for i, p in enumerate(presentadores):
+        if not isinstance(p, dict) or not isinstance(p.get("id"), str) or not isinstance(p.get("nombre"), str):
+            raise ValueError(f"presentadores[{i}]: se esperaba {{'id': str, 'nombre': str}}")
+        # El id viaja en callback_data ("mat_videos_url:<id>"), que Telegram limita a 64 bytes
+        if not p["id"] or ":" in p["id"] or len(p["id"].encode("utf-8")) > 16:
+            raise ValueError(f"presentadores[{i}]: id inválido {p['id']!r} (máx. 16 bytes, sin ':')")
+        if p["id"] in pids:
+            raise ValueError(f"presentadores[{i}]: id repetido {p['id']!r}")
+        pids.append(p["id"])
+
+    for seccion in ("materiales", "video_links", "enlaces_por_presentador"):
+        valor = raw.get(seccion, {})
+        if not isinstance(valor, dict):
+            raise ValueError(f"'{seccion}' debe ser un objeto")
+        desconocidos = set(valor) - set(pids)
+        if desconocidos:
+            raise ValueError(f"'{seccion}' referencia presentadores inexistentes: {sorted(desconocidos)}")
+
+    for pid, mat in raw.get("materiales", {}).items():
+        if not isinstance(mat, dict):
+            raise ValueError(f"materiales[{pid!r}] debe ser un objeto")
+        _dict_str(mat.get("docs", {}), f"materiales[{pid!r}].docs")
+        _dict_str(mat.get("videos", {}), f"materiales[{pid!r}].videos")
+    for pid, enlaces in raw.get("video_links", {}).items():
+        _dict_str(enlaces, f"video_links[{pid!r}]")
+    for pid, enlaces in raw.get("enlaces_por_presentador", {}).items():
+        _dict_str(enlaces, f"enlaces_por_presentador[{pid!r}]")
+    _dict_str(raw.get("enlaces_conexion", {}), "enlaces_conexion")
+
+    wifi = raw.get("wifi", {})
+    if not isinstance(wifi, dict):
+        raise ValueError("'wifi' debe ser un objeto")
+    for campo in ("ssid", "mensaje"):
+        if campo in wifi and (not isinstance(wifi[campo], str) or not wifi[campo].strip()):
+            raise ValueError(f"wifi.{campo} debe ser un texto no vacío")
+    return raw
+
+
+def compilar_catalogo(raw: dict, mtime: float = 0.0) -> Catalogo:
+    """Valida el catálogo y precalcula todos los teclados que dependen de él."""
+    validar_catalogo(raw)
+    presentadores = tuple((p["id"], p["nombre"]) for p in raw["presentadores"])
+    nombres = dict(presentadores)
+
+    # Archivos: los declarados en el JSON más los que estén en docs/<pid>/ o videos/<pid>/
+    # (estos últimos con el nombre del archivo como título).
+    indice = indexar_materiales()
+    materiales: Dict[str, Dict[str, Tuple[Material, ...]]] = {}
+    archivos: Dict[str, Material] = {}
+    for pid, _ in presentadores:
+        mat = raw.get("materiales", {}).get(pid, {})
+        materiales[pid] = {}
+        for tipo in ("docs", "videos"):
+            declarados = {_nfc(f"{tipo}/{f}"): t for t, f in mat.get(tipo, {}).items()}
+            for clave in declarados:
+                if clave not in indice:
+                    raise ValueError(f"materiales[{pid!r}].{tipo}: no existe el archivo {clave}")
+            automaticos = {c: indice[c].stem for c in sorted(indice)
+                           if c.startswith(f"{tipo}/{pid}/") and c not in declarados}
+            lista = []
+            for clave, titulo in {**declarados, **automaticos}.items():
+                m = Material(id=id_material(clave), pid=pid, titulo=titulo,
+                             ruta=indice[clave], es_video=(tipo == "videos"))
+                previo = archivos.get(m.id)
+                if previo and previo.ruta != m.ruta:
+                    raise ValueError(f"colisión de ID entre {previo.ruta.name} y {m.ruta.name}")
+                archivos[m.id] = m
+                lista.append(m)
+            materiales[pid][tipo] = tuple(lista)
+    video_links = {pid: dict(raw.get("video_links", {}).get(pid, {})) for pid, _ in presentadores}
+    enlaces_pres = {pid: dict(raw.get("enlaces_por_presentador", {}).get(pid, {})) for pid, _ in presentadores}
+    enlaces_conexion = dict(raw.get("enlaces_conexion", {}))
+
+    wifi = raw.get("wifi", {})
+    wifi_msg = (wifi.get("mensaje") or WIFI_MSG_PLANTILLA).replace("{ssid}", wifi.get("ssid") or WIFI_SSID)
+
+    teclados: Dict[str, InlineKeyboardMarkup] = {}
+    for prefix in ("mat_pres", "link_pres"):
+        rows = [[InlineKeyboardButton(nombre, callback_data=f"{prefix}:{pid}")] for pid, nombre in presentadores]
+        rows.append([InlineKeyboardButton("⬅️ Volver", callback_data="volver_menu_principal")])
+        teclados[f"pres:{prefix}"] = InlineKeyboardMarkup(rows)
+
+    for pid, _ in presentadores:
+        rows = [[InlineKeyboardButton(m.titulo, callback_data=f"d:{m.id}")] for m in materiales[pid]["docs"]]
+        rows.append([InlineKeyboardButton("⬅️ Volver", callback_data=f"mat_pres:{pid}")])
+        teclados[f"docs:{pid}"] = InlineKeyboardMarkup(rows)
+
+        rows = [[InlineKeyboardButton(nombre, url=_url_boton(url))] for nombre, url in video_links[pid].items()]
+        rows += [[InlineKeyboardButton(m.titulo, callback_data=f"d:{m.id}")] for m in materiales[pid]["videos"]]
+        rows.append([InlineKeyboardButton("⬅️ Volver", callback_data=f"mat_pres:{pid}")])
+        rows.append([InlineKeyboardButton("🏠 Menú principal", callback_data="volver_menu_principal")])
+        teclados[f"videos:{pid}"] = InlineKeyboardMarkup(rows)
+
+        rows = [[InlineKeyboardButton(nombre, url=_url_boton(url))] for nombre, url in enlaces_pres[pid].items()]
+        rows.append([InlineKeyboardButton("⬅️ Elegir otro presentador", callback_data="enlaces_por_presentador")])
+        rows.append([InlineKeyboardButton("🏠 Menú principal", callback_data="volver_menu_principal")])
+        teclados[f"links:{pid}"] = InlineKeyboardMarkup(rows)
+
+    rows = [[InlineKeyboardButton(nombre, url=_url_boton(url))] for nombre, url in enlaces_conexion.items()]
+    rows.append([InlineKeyboardButton("⬅️ Volver", callback_data="menu_enlaces")])
+    teclados["conexion"] = InlineKeyboardMarkup(rows)
+
+    return Catalogo(
+        version=str(raw["version"]),
+        presentadores=presentadores,
+        nombres=nombres,
+        materiales=materiales,
+        archivos=archivos,
+        video_links=video_links,
+        enlaces_por_presentador=enlaces_pres,
+        enlaces_conexion=enlaces_conexion,
+        wifi_msg=wifi_msg,
+        teclados=teclados,
+        mtime=mtime,
+    )
+
+
+def cargar_catalogo(ruta: Path = CATALOGO_JSON) -> Catalogo:
+    """Lee, valida y compila el catálogo. Es bloqueante: fuera del arranque, usar en un hilo."""
+    mtime = ruta.stat().st_mtime
+    raw = json.loads(ruta.read_text(encoding="utf-8"))
+    return compilar_catalogo(raw, mtime=mtime)
+
+
+def _catalogo_inicial(ruta: Path) -> Catalogo:
+    try:
+        return cargar_catalogo(ruta)
+    except (OSError, ValueError) as e:
+        log.error("No se pudo cargar %s (%s); se usa un catálogo vacío.", ruta, e)
+        return compilar_catalogo({"version": "vacío", "presentadores": []})
+
+
+async def recargar_catalogo(ev: "Evento") -> Tuple[Catalogo, Catalogo]:
+    """Compila el catálogo en un hilo y lo publica con una sola asignación. Devuelve (anterior, nuevo)."""
+    nuevo = await asyncio.to_thread(cargar_catalogo, ev.catalogo_json)
+    anterior, ev.catalogo = ev.catalogo, nuevo
+    log.info("Catálogo de %s recargado: v%s -> v%s", ev.id, anterior.version, nuevo.version)
+    return anterior, nuevo
+
+
+async def vigilar_catalogo(ev: "Evento", intervalo: int) -> None:
+    """Recarga el catálogo cuando cambia el mtime del archivo (un stat por intervalo)."""
+    mtime_invalido = None
+    while True:
+        await asyncio.sleep(intervalo)
+        mtime = None
+        try:
+            mtime = (await asyncio.to_thread(ev.catalogo_json.stat)).st_mtime
+            if mtime in (ev.catalogo.mtime, mtime_invalido):
+                continue
+            await recargar_catalogo(ev)
+        except (OSError, ValueError) as e:
+            if mtime is None:
+                # El archivo aún no existe (deploy nuevo): se vuelve a mirar en el próximo intervalo
+                log.debug("Catálogo de %s no disponible: %s", ev.id, e)
+                continue
+            mtime_invalido = mtime
+            log.warning("Catálogo de %s modificado pero inválido, se mantiene v%s: %s",
+                        ev.id, ev.catalogo.version, e)
+        except Exception:
+            # La tarea no debe morir: sin ella el catálogo no se vuelve a recargar solo
+            mtime_invalido = mtime
+            log.exception("Error inesperado vigilando el catálogo de %s", ev.id)
+
+# =========================
+# EVENTOS (varios bootcamps en un proceso)
+# =========================
+# Cada evento trae su nombre, fechas, admins, roster y catálogo. Se elige por
+# el token del bot (cada token tiene un evento por defecto) o con un deep link
+# t.me/<bot>?start=<evento_id>, que queda guardado en user_data. El pool de
+# PostgreSQL y los clientes HTTP son uno solo para todo el proceso; las filas
+# de subscribed_users y checkins llevan la columna evento.
+#
+# data/eventos.json (opcional; el primero es el evento por defecto):
+#   {"eventos": [{"id": "bootcamp-2025-bogota", "nombre": "Bootcamp 2025 Bogotá",
+#                 "token_env": "BOT_TOKEN", "launch_date": "2025-11-20",
+#                 "prelaunch_days": 2, "prelaunch_message": "...",
+#                 "admins": [7710920544], "staff": [],
+#                 "usuarios": "data/usuarios.json", "catalogo": "data/catalogo.json"}]}
+# Los valores que falten se toman de las variables de entorno de siempre.
+_EVENTO_ID_VALIDO = re.compile(r"^[A-Za-z0-9-]{1,48}$")  # cabe en un deep link y no choca con ci_
+
+@dataclass
+class Evento:
+    id: str
+    nombre: str
+    token: str
+    launch_date: str
+    prelaunch_days: int
+    prelaunch_message: str
+    admins: frozenset[int]
+    staff: frozenset[int]
+    usuarios_json: Path
+    catalogo_json: Path
+    roster: Roster
+    catalogo: Catalogo
+
+    @property
+    def bienvenida(self) -> str:
+        return BIENVENIDA.format(evento=self.nombre)
+
+def _ruta_evento(valor: Optional[str], por_defecto: Path) -> Path:
+    if not valor:
+        return por_defecto
+    ruta = Path(valor)
+    return ruta if ruta.is_absolute() else Path(__file__).parent / ruta
+
+def armar_evento(raw: dict) -> Evento:
+    evento_id = str(raw.get("id") or "")
+    if not _EVENTO_ID_VALIDO.match(evento_id):
+        raise ValueError(f"id de evento inválido: {evento_id!r} (letras, números y guiones)")
+    token = os.getenv(raw.get("token_env") or "BOT_TOKEN") or ""
+    admins = frozenset(int(x) for x in raw.get("admins", ADMINS))
+    usuarios_json = _ruta_evento(raw.get("usuarios"), USUARIOS_JSON)
+    catalogo_json = _ruta_evento(raw.get("catalogo"), CATALOGO_JSON)
+    return Evento(
+        id=evento_id,
+        nombre=raw.get("nombre") or NOMBRE_EVENTO,
+        token=token,
+        launch_date=raw.get("launch_date", LAUNCH_DATE_STR),
+        prelaunch_days=int(raw.get("prelaunch_days", PRELAUNCH_DAYS)),
+        prelaunch_message=raw.get("prelaunch_message") or PRELAUNCH_MESSAGE,
+        admins=admins,
+        staff=admins | frozenset(int(x) for x in raw.get("staff", STAFF)),
+        usuarios_json=usuarios_json,
+        catalogo_json=catalogo_json,
+        roster=indexar_roster(cargar_base_local(usuarios_json)),
+        catalogo=_catalogo_inicial(catalogo_json),
+    )
+
+def cargar_eventos(ruta: Path = EVENTOS_JSON) -> Dict[str, Evento]:
+    """Lee data/eventos.json; sin archivo, un único evento con la configuración del entorno."""
+    if ruta.exists():
+        crudos = json.loads(ruta.read_text(encoding="utf-8")).get("eventos") or []
+    else:
+        crudos = [{"id": EVENTO_ID}]
+    if not crudos:
+        raise ValueError(f"{ruta} no define ningún evento")
+    eventos: Dict[str, Evento] = {}
+    for raw in crudos:
+        ev = armar_evento(raw)
+        if ev.id in eventos:
+            raise ValueError(f"evento repetido: {ev.id}")
+        eventos[ev.id] = ev
+    return eventos
+
+EVENTOS: Dict[str, Evento] = cargar_eventos()
+EVENTO_POR_DEFECTO: Evento = next(iter(EVENTOS.values()))
+# Evento por defecto de cada bot: el primero de eventos.json que usa ese token
+EVENTO_DEL_TOKEN: Dict[str, Evento] = {}
+for _ev in EVENTOS.values():
+    EVENTO_DEL_TOKEN.setdefault(_ev.token, _ev)
+
+# Evento del update en curso; lo fija fijar_evento (grupo -2) antes que cualquier handler
+_EVENTO: contextvars.ContextVar[Evento] = contextvars.ContextVar("evento")
+
+def evento_actual() -> Evento:
+    return _EVENTO.get(EVENTO_POR_DEFECTO)
+
+def evento_del_bot(evento_id: Optional[str], token: str) -> Optional[Evento]:
+    """El evento pedido, solo si lo atiende este bot (roster, admins y suscriptores son del token)."""
+    ev = EVENTOS.get(evento_id) if evento_id else None
+    return ev if ev is not None and ev.token == token else None
+
+async def fijar_evento(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    elegido = context.user_data.get("evento") if context.user_data is not None else None
+    token = context.bot.token
+    _EVENTO.set(evento_del_bot(elegido, token) or EVENTO_DEL_TOKEN.get(token, EVENTO_POR_DEFECTO))
+
 # =========================
 # AUTH (RAM)
 # =========================
@@ -323,12 +683,14 @@ def bottom_keyboard() -> ReplyKeyboardMarkup:
 class PerfilUsuario:
     nombre: str
     autenticado: bool = False
+    cedula: Optional[str] = None
 
-PERFILES: Dict[int, PerfilUsuario] = {}
+# Clave (evento, user_id): validarse en un evento no da acceso a otro
+PERFILES: Dict[Tuple[str, int], PerfilUsuario] = {}
 
 async def ensure_auth(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Tuple[bool, int]:
     user_id = update.effective_user.id if update.effective_user else 0
-    perfil = PERFILES.get(user_id)
+    perfil = PERFILES.get((evento_actual().id, user_id))
     return (perfil is not None and perfil.autenticado), user_id
 
 # =========================
@@ -349,7 +711,8 @@ async def init_db():
         async with aconn.cursor() as cur:
             await cur.execute("""
             CREATE TABLE IF NOT EXISTS subscribed_users (
-                user_id         BIGINT PRIMARY KEY,
+                evento          TEXT NOT NULL,
+                user_id         BIGINT NOT NULL,
                 first_name      TEXT,
                 last_name       TEXT,
                 username        TEXT,
@@ -359,11 +722,42 @@ async def init_db():
                 correo          TEXT,
                 credential_used TEXT,
                 first_seen      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                last_seen       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                last_seen       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (evento, user_id)
             );
             """)
             await cur.execute("CREATE INDEX IF NOT EXISTS idx_subscribed_users_correo ON subscribed_users (correo);")
             await cur.execute("CREATE INDEX IF NOT EXISTS idx_subscribed_users_cedula ON subscribed_users (cedula);")
+            await cur.execute("""
+            CREATE TABLE IF NOT EXISTS checkins (
+                evento          TEXT NOT NULL,
+                user_id         BIGINT NOT NULL,
+                cedula          TEXT,
+                staff_id        BIGINT,
+                checked_in_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (evento, user_id)
+            );
+            """)
+            await cur.execute("CREATE INDEX IF NOT EXISTS idx_checkins_checked_in_at ON checkins (checked_in_at);")
+            for tabla in ("subscribed_users", "checkins"):
+                await migrar_columna_evento(cur, tabla)
+
+async def migrar_columna_evento(cur, tabla: str) -> None:
+    """Tablas de antes de multi-evento: agrega evento (filas viejas = evento por defecto) y cambia la PK."""
+    await cur.execute(sql.SQL(
+        "ALTER TABLE {} ADD COLUMN IF NOT EXISTS evento TEXT NOT NULL DEFAULT {}"
+    ).format(sql.Identifier(tabla), sql.Literal(EVENTO_POR_DEFECTO.id)))
+    await cur.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN evento DROP DEFAULT").format(sql.Identifier(tabla)))
+    await cur.execute("""
+        SELECT count(*) FROM pg_index i
+          JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+         WHERE i.indrelid = %s::regclass AND i.indisprimary;
+    """, (tabla,))
+    if (await cur.fetchone())[0] == 1:
+        await cur.execute(sql.SQL(
+            "ALTER TABLE {t} DROP CONSTRAINT {pk}, ADD PRIMARY KEY (evento, user_id)"
+        ).format(t=sql.Identifier(tabla), pk=sql.Identifier(f"{tabla}_pkey")))
+        log.info("Tabla %s migrada a PRIMARY KEY (evento, user_id)", tabla)
 
 async def upsert_user_seen(u) -> None:
     if not u:
@@ -372,15 +766,16 @@ async def upsert_user_seen(u) -> None:
     async with pool.connection() as aconn:
         async with aconn.cursor() as cur:
             await cur.execute("""
-                INSERT INTO subscribed_users (user_id, first_name, last_name, username, language, first_seen, last_seen)
-                VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
-                ON CONFLICT (user_id) DO UPDATE
+                INSERT INTO subscribed_users (evento, user_id, first_name, last_name, username, language,
+                                              first_seen, last_seen)
+                VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
+                ON CONFLICT (evento, user_id) DO UPDATE
                    SET first_name = EXCLUDED.first_name,
                        last_name  = EXCLUDED.last_name,
                        username   = EXCLUDED.username,
                        language   = EXCLUDED.language,
                        last_seen  = NOW();
-            """, (u.id, getattr(u, "first_name", None), getattr(u, "last_name", None),
+            """, (evento_actual().id, u.id, getattr(u, "first_name", None), getattr(u, "last_name", None),
                   getattr(u, "username", None), getattr(u, "language_code", None)))
 
 async def persistir_validacion(user_id: int, nombre: str,
@@ -390,108 +785,213 @@ async def persistir_validacion(user_id: int, nombre: str,
     async with pool.connection() as aconn:
         async with aconn.cursor() as cur:
             await cur.execute("""
-                INSERT INTO subscribed_users (user_id, nombre, cedula, correo, credential_used, last_seen)
-                VALUES (%s, %s, %s, %s, %s, NOW())
-                ON CONFLICT (user_id) DO UPDATE
+                INSERT INTO subscribed_users (evento, user_id, nombre, cedula, correo, credential_used, last_seen)
+                VALUES (%s, %s, %s, %s, %s, %s, NOW())
+                ON CONFLICT (evento, user_id) DO UPDATE
                    SET nombre = EXCLUDED.nombre,
                        cedula = COALESCE(EXCLUDED.cedula, subscribed_users.cedula),
                        correo = COALESCE(EXCLUDED.correo, subscribed_users.correo),
                        credential_used = EXCLUDED.credential_used,
                        last_seen = NOW();
-            """, (user_id, nombre, cedula, correo, credential_used))
+            """, (evento_actual().id, user_id, nombre, cedula, correo, credential_used))
 
-async def fetch_broadcast_user_ids() -> list[int]:
+async def fetch_broadcast_user_ids(evento: str) -> list[int]:
     pool = await get_db_pool()
     async with pool.connection() as aconn:
         async with aconn.cursor() as cur:
-            await cur.execute("SELECT user_id FROM subscribed_users WHERE nombre IS NOT NULL;")
+            await cur.execute("SELECT user_id FROM subscribed_users WHERE evento = %s AND nombre IS NOT NULL;",
+                              (evento,))
             rows = await cur.fetchall()
     return [r[0] for r in rows]
 
+async def insertar_checkins(lote: list[Tuple[str, int, Optional[str], int, datetime]]) -> None:
+    pool = await get_db_pool()
+    async with pool.connection() as aconn:
+        async with aconn.cursor() as cur:
+            await cur.executemany("""
+                INSERT INTO checkins (evento, user_id, cedula, staff_id, checked_in_at)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (evento, user_id) DO NOTHING;
+            """, lote)
+
+async def fetch_checkins(desde: Optional[datetime] = None) -> list[Tuple[str, int, datetime]]:
+    pool = await get_db_pool()
+    async with pool.connection() as aconn:
+        async with aconn.cursor() as cur:
+            if desde is None:
+                await cur.execute("SELECT evento, user_id, checked_in_at FROM checkins;")
+            else:
+                await cur.execute("SELECT evento, user_id, checked_in_at FROM checkins WHERE checked_in_at > %s;",
+                                  (desde,))
+            return await cur.fetchall()
+
+EXPORT_SQL = """
+    COPY (
+        SELECT nombre, cedula, correo, first_seen, last_seen
+          FROM subscribed_users
+         WHERE evento = %s AND nombre IS NOT NULL
+         ORDER BY first_seen
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+EXPORT_LOTE_BYTES = 256 * 1024
+
+async def exportar_suscritos_csv(evento: str, destino: Path) -> int:
+    """Escribe los usuarios validados en un CSV comprimido (gzip) y devuelve cuántas filas tiene.
+
+    COPY ... TO STDOUT hace que el servidor envíe las filas por bloques a medida
+    que las lee (más o menos una fila por bloque). Se juntan en lotes de
+    EXPORT_LOTE_BYTES que se comprimen y escriben en un hilo: el event loop solo
+    concatena bytes, y la memoria usada no depende del número de filas.
+    """
+    pool = await get_db_pool()
+    gz = await asyncio.to_thread(gzip.open, destino, "wb")
+    try:
+        lote = ["\ufeff".encode("utf-8")]  # BOM: Excel abre bien las tildes
+        tam = 0
+        async with pool.connection() as aconn:
+            async with aconn.cursor() as cur:
+                async with cur.copy(EXPORT_SQL, (evento,)) as copy:
+                    async for bloque in copy:
+                        lote.append(bloque)
+                        tam += len(bloque)
+                        if tam >= EXPORT_LOTE_BYTES:
+                            await asyncio.to_thread(gz.write, b"".join(lote))
+                            lote, tam = [], 0
+                await asyncio.to_thread(gz.write, b"".join(lote))
+                return cur.rowcount
+    finally:
+        await asyncio.to_thread(gz.close)
+
 # =========================
 # HELPERS
 # =========================
-def buscar_en_base(clave: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+def buscar_en_base(clave: str, roster: Roster) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
     c = normaliza(clave)
-    nombre = BASE_LOCAL.get(c)
+    nombre = roster.claves.get(c)
     if not nombre:
         return None
-    cedula_detectada = c if es_cedula(c) else None
-    correo_detectado = c if es_correo(c) else None
-    for k, v in BASE_LOCAL.items():
-        if v != nombre:
-            continue
-        if not cedula_detectada and es_cedula(k):
-            cedula_detectada = k
-        if not correo_detectado and es_correo(k):
-            correo_detectado = k
-        if cedula_detectada and correo_detectado:
-            break
-    return (nombre, cedula_detectada, correo_detectado)
+    cedula, correo = roster.contacto[nombre]
+    return (nombre, c if es_cedula(c) else cedula, c if es_correo(c) else correo)
+
+# =========================
+# RESPUESTAS (menos llamadas a la API)
+# =========================
+_TAREAS_SUELTAS: set[asyncio.Task] = set()
+
+def _fin_tarea_suelta(t: asyncio.Task) -> None:
+    _TAREAS_SUELTAS.discard(t)
+    if not t.cancelled() and t.exception():
+        log.debug("Llamada en segundo plano falló: %r", t.exception())
+
+def en_segundo_plano(coro) -> None:
+    """Dispara una llamada no crítica (chat action, answer de callback) sin esperarla."""
+    t = asyncio.create_task(coro)
+    _TAREAS_SUELTAS.add(t)
+    t.add_done_callback(_fin_tarea_suelta)
+
+async def responder(upd_or_q, texto: str, **kwargs):
+    """Una sola llamada: edita el mensaje del botón si es posible; si no, responde.
+
+    Los mensajes con archivo (documento/video con menú adjunto) no tienen texto
+    editable, así que ahí se responde con un mensaje nuevo.
+    """
+    if isinstance(upd_or_q, CallbackQuery):
+        q = upd_or_q
+        if q.message and q.message.text is not None:
+            try:
+                return await q.edit_message_text(texto, **kwargs)
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    return None
+                raise
+        return await q.message.reply_text(texto, **kwargs)
+    return await upd_or_q.effective_message.reply_text(texto, **kwargs)
 
 async def envia_documento(upd_or_q, context: ContextTypes.DEFAULT_TYPE, ruta: Path, nombre_mostrar: str):
+    """Envía el archivo con el menú principal adjunto (un solo mensaje).
+
+    Solo los videos muestran un aviso de espera; se reutiliza el mensaje del
+    botón cuando viene de un callback en lugar de publicar uno nuevo.
+    """
     if isinstance(upd_or_q, Update):
         chat = upd_or_q.effective_chat
-        message = upd_or_q.effective_message
+        origen = upd_or_q.callback_query or upd_or_q
     else:
-        q = upd_or_q
-        chat = q.message.chat
-        message = q.message
+        chat = upd_or_q.message.chat
+        origen = upd_or_q
 
     if not ruta.exists():
-        await message.reply_text(f"⚠️ No encuentro el archivo: {nombre_mostrar}")
+        await responder(origen, f"⚠️ No encuentro el archivo: {nombre_mostrar}", reply_markup=principal_inline())
         return
 
     ext = ruta.suffix.lower()
     es_video = ext in {".mp4", ".mov", ".m4v"}
 
     action = ChatAction.UPLOAD_VIDEO if es_video else ChatAction.UPLOAD_DOCUMENT
-    texto_espera = "⏳ Preparando y enviando el video… puede tardar unos minutos." if es_video \
-                   else "⏳ Preparando y enviando el archivo…"
-
-    await chat.send_action(action=action)
-    aviso = await message.reply_text(texto_espera)
+    en_segundo_plano(chat.send_action(action=action))
+    aviso = None
+    if es_video:
+        aviso = await responder(origen, "⏳ Preparando y enviando el video… puede tardar unos minutos.")
 
-    for i in range(1, 4):
-        try:
-            with ruta.open("rb") as f:
-                if es_video:
-                    await message.reply_video(video=InputFile(f, filename=ruta.name), caption=nombre_mostrar, supports_streaming=True)
-                else:
-                    await message.reply_document(document=InputFile(f, filename=ruta.name), caption=nombre_mostrar)
-            await aviso.edit_text("✅ Archivo enviado.")
-            await message.reply_text("¿Qué deseas hacer ahora?", reply_markup=principal_inline())
-            return
-        except (TimedOut, NetworkError) as e:
-            if i < 3:
-                espera = 2 ** i
-                try:
-                    await aviso.edit_text(f"⚠️ Conexión inestable, reintentando en {espera}s… (intento {i}/3)")
-                except Exception:
-                    pass
-                await asyncio.sleep(espera)
-                continue
+    # Los reintentos ante TimedOut/NetworkError/429 los hace HTTPXRequestResiliente
+    try:
+        with ruta.open("rb") as f:
+            if es_video:
+                await bot_cargas(context).send_video(chat_id=chat.id, video=InputFile(f, filename=ruta.name),
+                                                     caption=nombre_mostrar, supports_streaming=True,
+                                                     reply_markup=principal_inline())
             else:
-                await aviso.edit_text(f"❌ No se pudo enviar el archivo. Detalle: {e}")
-                return
-        except Exception as e:
-            await aviso.edit_text(f"❌ Error al enviar el archivo: {e}")
-            return
+                await bot_cargas(context).send_document(chat_id=chat.id, document=InputFile(f, filename=ruta.name),
+                                                        caption=nombre_mostrar,
+                                                        reply_markup=principal_inline())
+    except (TimedOut, NetworkError) as e:
+        texto = f"❌ No se pudo enviar el archivo. Detalle: {e}"
+    except Exception as e:
+        texto = f"❌ Error al enviar el archivo: {e}"
+    else:
+        # El video ya lleva el menú adjunto: el aviso de espera sobra
+        if aviso:
+            en_segundo_plano(aviso.delete())
+        return
+    try:
+        if aviso:
+            await aviso.edit_text(texto, reply_markup=principal_inline())
+        else:
+            await responder(origen, texto, reply_markup=principal_inline())
+    except Exception:
+        pass
 
 # =========================
 # HANDLERS BÁSICOS
 # =========================
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # QR de ingreso escaneado con la cámara: abre el bot con /start ci_<token>.
+    # Va antes del upsert: en la puerta cada escaneo se resuelve sin tocar la base.
+    if context.args and context.args[0].startswith("ci_"):
+        if update.effective_user.id in evento_actual().staff:
+            await procesar_checkin(update, context.args[0])
+        else:
+            en_segundo_plano(upsert_user_seen(update.effective_user))
+            await update.message.reply_text("🎟️ Este es un código de ingreso: muéstralo al personal en la entrada.")
+        return
+    # Deep link t.me/<bot>?start=<evento_id>: este usuario pasa a ese evento (si es de este bot)
+    elegido = evento_del_bot(context.args[0], context.bot.token) if context.args else None
+    if elegido:
+        context.user_data["evento"] = elegido.id
+        _EVENTO.set(elegido)
     await upsert_user_seen(update.effective_user)
-    en_pre, msg = esta_en_prelanzamiento()
+    ev = evento_actual()
+    en_pre, msg = esta_en_prelanzamiento(ev)
     if en_pre:
         await update.message.reply_text(msg)
         return
     await update.message.reply_text(
-        f"👋 Hola, este es el bot del {NOMBRE_EVENTO}.\n\n"
+        f"👋 Hola, este es el bot del {ev.nombre}.\n\n"
         "Por favor escribe tu **cédula** o **correo registrado** para validar tu acceso:",
         reply_markup=bottom_keyboard()
     )
+    context.user_data["teclado_inferior"] = True
 
 async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await upsert_user_seen(update.effective_user)
@@ -501,6 +1001,12 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/help - Ayuda\n"
         "/broadcast - (admins) iniciar envío masivo\n"
         "/cancel - cancelar envío masivo\n"
+        "/reload - (admins) recargar catálogo de contenido\n"
+        "/stats - (admins) estadísticas de uso de la API\n"
+        "/profile <segundos> - (admins) perfilar el bot en vivo\n"
+        "/export - (admins) descargar CSV de asistentes validados\n"
+        "/qr - ver tu código de ingreso al evento\n"
+        "/checkin - (personal) modo de verificación en la entrada\n"
         "/miid - ver tu ID de Telegram\n"
     )
 
@@ -512,8 +1018,9 @@ async def miid_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🆔 *Tu información de Telegram*\n"
         f"• ID: `{uid}`\n"
-        f"• Username: {un}\n\n"
-        "Si eres admin, asegúrate de que tu ID esté en la lista ADMINS.",
+        f"• Username: {un}\n"
+        f"• Evento: `{evento_actual().id}`\n\n"
+        "Si eres admin, asegúrate de que tu ID esté en la lista ADMINS del evento.",
         parse_mode="Markdown"
     )
 # --- NUEVO: handler que captura medios (no texto) y ejecuta broadcast si está activo
@@ -537,14 +1044,15 @@ async def menu_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # =========================
 async def broadcast_start_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
     await upsert_user_seen(query.from_user)
     uid = query.from_user.id
-    if uid not in ADMINS:
+    if uid not in evento_actual().admins:
         await query.answer("Solo para administradores.", show_alert=True)
         return
+    en_segundo_plano(query.answer())
     context.user_data["bcast"] = True
-    await query.edit_message_text(
+    await responder(
+        query,
         "📣 *Envío masivo*\n\nEnvía ahora el mensaje que deseas reenviar a TODOS "
         "los usuarios **validados** (texto, foto, video o documento).\n\n"
         "Escribe /cancel para cancelar.",
@@ -554,7 +1062,7 @@ async def broadcast_start_cb(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def broadcast_start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await upsert_user_seen(update.effective_user)
     uid = update.effective_user.id
-    if uid not in ADMINS:
+    if uid not in evento_actual().admins:
         await update.message.reply_text("🚫 Este comando es solo para administradores.")
         return
     context.user_data["bcast"] = True
@@ -567,28 +1075,27 @@ async def broadcast_start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def broadcast_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.pop("bcast", None)
-    await update.message.reply_text("Operación cancelada.")
-    await update.message.reply_text("Menú principal:", reply_markup=principal_inline())
+    await update.message.reply_text("Operación cancelada.\n\nMenú principal:", reply_markup=principal_inline())
 
 async def intentar_broadcast_si_corresponde(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     uid = update.effective_user.id if update.effective_user else 0
-    if uid not in ADMINS:
+    if uid not in evento_actual().admins:
         return False
     if not context.user_data.get("bcast"):
         return False
 
     context.user_data["bcast"] = False
 
-    targets = await fetch_broadcast_user_ids()
+    targets = await fetch_broadcast_user_ids(evento_actual().id)
     if not targets:
-        await update.message.reply_text("⚠️ Aún no hay usuarios validados en la base de datos.")
-        await update.message.reply_text("Menú principal:", reply_markup=principal_inline())
+        await update.message.reply_text("⚠️ Aún no hay usuarios validados en la base de datos.\n\nMenú principal:",
+                                        reply_markup=principal_inline())
         return True
 
     ok, fail = 0, 0
     for tid in targets:
         try:
-            await context.bot.copy_message(
+            await bot_difusion(context).copy_message(
                 chat_id=tid,
                 from_chat_id=update.effective_chat.id,
                 message_id=update.message.message_id
@@ -598,10 +1105,266 @@ async def intentar_broadcast_si_corresponde(update: Update, context: ContextType
             fail += 1
         await asyncio.sleep(0.03)
 
-    await update.message.reply_text(f"✅ Enviado a {ok} usuarios. ❌ Fallidos: {fail}")
-    await update.message.reply_text("Menú principal:", reply_markup=principal_inline())
+    await update.message.reply_text(f"✅ Enviado a {ok} usuarios. ❌ Fallidos: {fail}\n\nMenú principal:",
+                                    reply_markup=principal_inline())
     return True
 
+# =========================
+# CHECK-IN EN LA PUERTA (QR firmado)
+# =========================
+# El QR lleva un deep link t.me/<bot>?start=ci_<token>. El token es
+# user_id + cédula firmados con HMAC (la firma incluye el id del evento, así que
+# un QR de otro evento no valida), y el personal verifica en O(1) sin leer la
+# base. Los ingresos se guardan en memoria (para rechazar duplicados al
+# instante) y se escriben a PostgreSQL por lotes.
+_TOKEN_FMT = struct.Struct(">QB")  # user_id, largo de la cédula; siguen los dígitos en ASCII
+_TOKEN_FIRMA_BYTES = 10
+# Con 20 dígitos el deep link (ci_ + base64) queda en 55 caracteres; Telegram admite 64
+_TOKEN_CEDULA_MAX = 20
+CHECKIN_LOTE_MAX = 200
+CHECKIN_SYNC_SECS = 30
+
+def _firma_checkin(evento: str, payload: bytes) -> bytes:
+    mensaje = b"ci3" + evento.encode("ascii") + b"\0" + payload
+    return hmac.new(CHECKIN_SECRET, mensaje, hashlib.sha256).digest()[:_TOKEN_FIRMA_BYTES]
+
+def emitir_token_checkin(evento: str, user_id: int, cedula: Optional[str]) -> str:
+    # Los dígitos van como texto: se conservan los ceros a la izquierda
+    digitos = "".join(ch for ch in (cedula or "") if ch.isdigit())
+    if len(digitos) > _TOKEN_CEDULA_MAX:
+        digitos = ""  # no cabe en el QR; el ingreso se valida igual por user_id
+    payload = _TOKEN_FMT.pack(user_id, len(digitos)) + digitos.encode("ascii")
+    return base64.urlsafe_b64encode(payload + _firma_checkin(evento, payload)).rstrip(b"=").decode("ascii")
+
+def verificar_token_checkin(evento: str, token: str) -> Optional[Tuple[int, Optional[str]]]:
+    """Devuelve (user_id, cédula) si la firma es válida; None en cualquier otro caso."""
+    if not CHECKIN_SECRET:
+        return None  # con clave vacía cualquiera podría firmar sus propios tokens
+    token = token.strip()
+    if "start=" in token:
+        token = token.split("start=", 1)[1]
+    token = token.removeprefix("ci_")
+    try:
+        crudo = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except ValueError:
+        return None
+    if len(crudo) < _TOKEN_FMT.size + _TOKEN_FIRMA_BYTES:
+        return None
+    user_id, largo = _TOKEN_FMT.unpack_from(crudo)
+    fin = _TOKEN_FMT.size + largo
+    if len(crudo) != fin + _TOKEN_FIRMA_BYTES:
+        return None
+    payload, firma = crudo[:fin], crudo[fin:]
+    if not hmac.compare_digest(firma, _firma_checkin(evento, payload)):
+        return None
+    cedula = payload[_TOKEN_FMT.size:].decode("ascii")
+    return user_id, (cedula or None)
+
+class RegistroCheckins:
+    """Ingresos en memoria (por evento) + un único escritor por lotes hacia la tabla checkins."""
+
+    def __init__(self):
+        self.ingresos: Dict[str, Dict[int, datetime]] = {}
+        self._cola: asyncio.Queue = asyncio.Queue()
+        self._ultima_sync: Optional[datetime] = None
+
+    def del_evento(self, evento: str) -> Dict[int, datetime]:
+        return self.ingresos.setdefault(evento, {})
+
+    def registrar(self, evento: str, user_id: int, cedula: Optional[str], staff_id: int) -> Optional[datetime]:
+        """Marca el ingreso. Si ya había ingresado, devuelve la hora del primer ingreso."""
+        ingresos = self.del_evento(evento)
+        previo = ingresos.get(user_id)
+        if previo:
+            return previo
+        ahora = hoy_utc()
+        ingresos[user_id] = ahora
+        self._cola.put_nowait((evento, user_id, cedula, staff_id, ahora))
+        return None
+
+    async def sincronizar(self) -> None:
+        # Margen de 1 min: otras instancias escriben con algo de retraso por el lote
+        desde = self._ultima_sync - timedelta(minutes=1) if self._ultima_sync else None
+        self._ultima_sync = hoy_utc()
+        for evento, user_id, cuando in await fetch_checkins(desde):
+            self.del_evento(evento).setdefault(user_id, cuando)
+
+    def _segundos_para_sync(self) -> float:
+        if self._ultima_sync is None:
+            return 0.0
+        return CHECKIN_SYNC_SECS - (hoy_utc() - self._ultima_sync).total_seconds()
+
+    async def escribir_lotes(self) -> None:
+        while True:
+            # Sincroniza cada CHECKIN_SYNC_SECS aunque la cola nunca se vacíe (hora pico en la puerta)
+            espera = self._segundos_para_sync()
+            if espera <= 0:
+                await self._sincronizar_seguro()
+                continue
+            try:
+                primero = await asyncio.wait_for(self._cola.get(), timeout=espera)
+            except asyncio.TimeoutError:
+                continue
+            lote = [primero]
+            await asyncio.sleep(1)  # junta lo que llegue en el próximo segundo
+            while len(lote) < CHECKIN_LOTE_MAX and not self._cola.empty():
+                lote.append(self._cola.get_nowait())
+            try:
+                await insertar_checkins(lote)
+            except Exception as e:
+                log.warning("No se pudieron guardar %d check-ins, se reintenta: %s", len(lote), e)
+                for fila in lote:
+                    self._cola.put_nowait(fila)
+                await asyncio.sleep(5)
+
+    async def _sincronizar_seguro(self) -> None:
+        try:
+            await self.sincronizar()
+        except Exception as e:
+            log.warning("No se pudo sincronizar check-ins: %s", e)
+
+CHECKINS = RegistroCheckins()
+
+async def envia_qr_ingreso(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                           user_id: int, cedula: Optional[str]) -> None:
+    if not CHECKIN_SECRET:
+        return
+    token = emitir_token_checkin(evento_actual().id, user_id, cedula)
+    enlace = f"https://t.me/{context.bot.username}?start=ci_{token}"
+    png = io.BytesIO()
+    segno.make(enlace, error="m").save(png, kind="png", scale=8, border=2)
+    png.seek(0)
+    await update.effective_message.reply_photo(
+        photo=png,
+        caption="🎟️ *Tu código de ingreso*\nMuéstralo en la entrada del evento. No lo compartas.",
+        parse_mode="Markdown",
+    )
+
+async def procesar_checkin(update: Update, token: str) -> None:
+    ev = evento_actual()
+    if not CHECKIN_SECRET:
+        await update.message.reply_text("El check-in con QR no está habilitado en este evento.")
+        return
+    datos = verificar_token_checkin(ev.id, token)
+    if not datos:
+        await update.message.reply_text(f"❌ Código inválido para {ev.nombre}.")
+        return
+    user_id, cedula = datos
+    nombre = ev.roster.claves.get(normaliza(cedula), "") if cedula else ""
+    previo = CHECKINS.registrar(ev.id, user_id, cedula, update.effective_user.id)
+    if previo:
+        hora = previo.astimezone(timezone(timedelta(hours=-5))).strftime("%H:%M")
+        await update.message.reply_text(f"⚠️ YA INGRESÓ a las {hora}. {nombre}\nCédula: {cedula or '—'}")
+        return
+    await update.message.reply_text(f"✅ Ingreso registrado. {nombre}\nCédula: {cedula or '—'}")
+
+async def checkin_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    uid = update.effective_user.id
+    ev = evento_actual()
+    if uid not in ev.staff:
+        await update.message.reply_text("🚫 Este comando es solo para el personal del evento.")
+        return
+    if not CHECKIN_SECRET:
+        context.user_data.pop("checkin", None)
+        await update.message.reply_text("El check-in con QR no está habilitado en este evento.")
+        return
+    activo = not context.user_data.get("checkin")
+    context.user_data["checkin"] = activo
+    if activo:
+        await update.message.reply_text(
+            "🎟️ *Modo check-in activado*\n\nEscanea los QR con la cámara (abren este bot) "
+            "o pega aquí el código/enlace. Escribe /checkin de nuevo para salir.\n"
+            f"Evento: {ev.nombre}\nIngresos registrados: {len(CHECKINS.del_evento(ev.id))}",
+            parse_mode="Markdown",
+        )
+    else:
+        await update.message.reply_text("Modo check-in desactivado.")
+
+async def intentar_checkin_si_corresponde(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    uid = update.effective_user.id if update.effective_user else 0
+    if uid not in evento_actual().staff or not context.user_data.get("checkin"):
+        return False
+    await procesar_checkin(update, update.message.text or "")
+    return True
+
+async def qr_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await upsert_user_seen(update.effective_user)
+    autenticado, user_id = await ensure_auth(update, context)
+    if not autenticado:
+        await update.message.reply_text("⚠️ Debes validarte primero. Escribe tu **cédula** o **correo**.")
+        return
+    if not CHECKIN_SECRET:
+        await update.message.reply_text("El check-in con QR no está habilitado en este evento.")
+        return
+    await envia_qr_ingreso(update, context, user_id, PERFILES[(evento_actual().id, user_id)].cedula)
+
+# =========================
+# ADMIN: CATÁLOGO Y ESTADÍSTICAS
+# =========================
+async def reload_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await upsert_user_seen(update.effective_user)
+    uid = update.effective_user.id
+    if uid not in evento_actual().admins:
+        await update.message.reply_text("🚫 Este comando es solo para administradores.")
+        return
+    try:
+        anterior, nuevo = await recargar_catalogo(evento_actual())
+    except (OSError, ValueError) as e:
+        await update.message.reply_text(
+            f"❌ Catálogo inválido, se mantiene la versión {evento_actual().catalogo.version}.\nDetalle: {e}"
+        )
+        return
+    await update.message.reply_text(
+        f"✅ Catálogo recargado: versión {anterior.version} → {nuevo.version}\n"
+        f"• Presentadores: {len(nuevo.presentadores)}\n"
+        f"• Enlaces de conexión: {len(nuevo.enlaces_conexion)}"
+    )
+
+async def stats_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await upsert_user_seen(update.effective_user)
+    uid = update.effective_user.id
+    if uid not in evento_actual().admins:
+        await update.message.reply_text("🚫 Este comando es solo para administradores.")
+        return
+    await update.message.reply_text(resumen_metricas(), parse_mode="Markdown")
+
+async def profile_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    global _PERFIL_EN_CURSO
+    await upsert_user_seen(update.effective_user)
+    uid = update.effective_user.id
+    if uid not in evento_actual().admins:
+        await update.message.reply_text("🚫 Este comando es solo para administradores.")
+        return
+    try:
+        segundos = int(context.args[0]) if context.args else 10
+    except ValueError:
+        await update.message.reply_text("Uso: /profile <segundos>")
+        return
+    segundos = max(1, min(segundos, PERFIL_MAX_SECS))
+    if _PERFIL_EN_CURSO:
+        await update.message.reply_text("⏳ Ya hay un perfilado en curso.")
+        return
+    _PERFIL_EN_CURSO = True
+    await update.message.reply_text(f"🔬 Perfilando durante {segundos}s… te envío los resultados al terminar.")
+    context.application.create_task(perfilar(update, context, segundos), update=update)
+
+async def export_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await upsert_user_seen(update.effective_user)
+    uid = update.effective_user.id
+    if uid not in evento_actual().admins:
+        await update.message.reply_text("🚫 Este comando es solo para administradores.")
+        return
+    marca = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M")
+    destino = Path(await asyncio.to_thread(tempfile.mkdtemp, prefix="export-"))
+    ruta = destino / f"asistentes-{evento_actual().id}-{marca}.csv.gz"
+    try:
+        filas = await exportar_suscritos_csv(evento_actual().id, ruta)
+        await envia_documento(update, context, ruta, f"📋 {filas} asistentes validados ({marca} UTC)")
+    except Exception as e:
+        await update.message.reply_text(f"❌ No se pudo generar la exportación: {e}")
+    finally:
+        await asyncio.to_thread(shutil.rmtree, destino, ignore_errors=True)
+
 # =========================
 # ACCIONES / MENÚ TEXTO
 # =========================
@@ -612,8 +1375,12 @@ async def text_ingreso_o_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
     if await intentar_broadcast_si_corresponde(update, context):
         return
 
+    # 1b) Personal en modo check-in: el texto es un código escaneado
+    if await intentar_checkin_si_corresponde(update, context):
+        return
+
     # 2) Normal
-    en_pre, msg = esta_en_prelanzamiento()
+    en_pre, msg = esta_en_prelanzamiento(evento_actual())
     if en_pre:
         await update.message.reply_text(msg)
         return
@@ -634,6 +1401,7 @@ async def text_ingreso_o_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
                 "Menú ocultado. Usa /menu para volver a mostrarlo.",
                 reply_markup=ReplyKeyboardRemove()
             )
+            context.user_data.pop("teclado_inferior", None)
             return
         await update.message.reply_text("Estás autenticado. Usa el menú:", reply_markup=principal_inline())
         return
@@ -644,7 +1412,7 @@ async def text_ingreso_o_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❗ Por favor escribe tu **cédula** o **correo**.")
         return
 
-    encontrado = buscar_en_base(clave)
+    encontrado = buscar_en_base(clave, evento_actual().roster)
     if not encontrado:
         await update.message.reply_text(
             "🚫 No encuentro tu registro en la base.\n\n"
@@ -653,7 +1421,7 @@ async def text_ingreso_o_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     nombre, cedula, correo = encontrado
-    PERFILES[user_id] = PerfilUsuario(nombre=nombre, autenticado=True)
+    PERFILES[(evento_actual().id, user_id)] = PerfilUsuario(nombre=nombre, autenticado=True, cedula=cedula)
 
     await persistir_validacion(
         user_id=user_id,
@@ -664,50 +1432,31 @@ async def text_ingreso_o_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
 
     primer_nombre = nombre.split()[0]
-    await update.message.reply_text(
-        f"¡Hola, {primer_nombre}! 😊\n{BIENVENIDA}",
-        reply_markup=bottom_keyboard()
-    )
-    await update.message.reply_text("Menú principal:", reply_markup=principal_inline())
+    # Telegram no permite teclado inferior e inline en el mismo mensaje: si el
+    # teclado inferior ya se mostró en /start, basta un único mensaje.
+    if not context.user_data.get("teclado_inferior"):
+        await update.message.reply_text(f"¡Hola, {primer_nombre}! 😊", reply_markup=bottom_keyboard())
+        context.user_data["teclado_inferior"] = True
+        saludo = evento_actual().bienvenida
+    else:
+        saludo = f"¡Hola, {primer_nombre}! 😊\n{evento_actual().bienvenida}"
+    await update.message.reply_text(f"{saludo}\n\nMenú principal:", reply_markup=principal_inline())
+    await envia_qr_ingreso(update, context, user_id, cedula)
 
 # =========================
 # CALLBACKS MENÚ (incluye Material, Ubicación y Wi-Fi)
 # =========================
 async def accion_ubicacion(upd_or_q, context: ContextTypes.DEFAULT_TYPE):
-    if isinstance(upd_or_q, Update):
-        msg = upd_or_q.message
-        await msg.reply_text("📍 *Ubicación del evento*\nToca el botón para abrir en Google Maps.",
-                             parse_mode="Markdown", reply_markup=ubicacion_inline())
-    else:
-        q = upd_or_q
-        await q.edit_message_text("📍 *Ubicación del evento*\nToca el botón para abrir en Google Maps.",
-                                  parse_mode="Markdown", reply_markup=ubicacion_inline())
+    await responder(upd_or_q, "📍 *Ubicación del evento*\nToca el botón para abrir en Google Maps.",
+                    parse_mode="Markdown", reply_markup=ubicacion_inline())
 
 async def accion_wifi(upd_or_q, context: ContextTypes.DEFAULT_TYPE):
-    if isinstance(upd_or_q, Update):
-        msg = upd_or_q.message
-        await msg.reply_text(WIFI_MSG, parse_mode="Markdown", reply_markup=wifi_inline())
-    else:
-        q = upd_or_q
-        await q.edit_message_text(WIFI_MSG, parse_mode="Markdown", reply_markup=wifi_inline())
+    await responder(upd_or_q, evento_actual().catalogo.wifi_msg, parse_mode="Markdown", reply_markup=wifi_inline())
 
 async def accion_agenda(upd_or_q, context: ContextTypes.DEFAULT_TYPE):
     """Envía el PDF de la agenda si existe; de lo contrario, muestra un texto."""
-    texto_header = "📅 Agenda del evento"
-    if isinstance(upd_or_q, Update):
-        message = upd_or_q.message
-        edit = None
-    else:
-        q = upd_or_q
-        message = q.message
-        edit = q.edit_message_text
-
     if AGENDA_PDF.exists():
-        if edit:
-            await edit(f"{texto_header} (PDF disponible para descargar).")
-        else:
-            await message.reply_text(f"{texto_header} (PDF disponible para descargar).")
-        await envia_documento(upd_or_q, context, AGENDA_PDF, "Agenda del evento")
+        await envia_documento(upd_or_q, context, AGENDA_PDF, "📅 Agenda del evento")
         return
 
     # Fallback si no subiste data/agenda.pdf
@@ -718,32 +1467,30 @@ async def accion_agenda(upd_or_q, context: ContextTypes.DEFAULT_TYPE):
         "- Horario: 7:00 pm - 9:00 pm (Hora Colombia)\n\n"
         "_(Puedes subir un PDF como `data/agenda.pdf` para compartirlo automáticamente.)_"
     )
-    if edit:
-        await edit(texto, parse_mode="Markdown", reply_markup=principal_inline())
-    else:
-        await message.reply_text(texto, parse_mode="Markdown", reply_markup=principal_inline())
+    await responder(upd_or_q, texto, parse_mode="Markdown", reply_markup=principal_inline())
 
 
 
 async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
+    en_segundo_plano(query.answer())
     await upsert_user_seen(query.from_user)
 
-    en_pre, msg = esta_en_prelanzamiento()
+    en_pre, msg = esta_en_prelanzamiento(evento_actual())
     if en_pre:
-        await query.message.reply_text(msg)
+        await responder(query, msg)
         return
 
     autenticado, _ = await ensure_auth(update, context)
     if not autenticado:
-        await query.edit_message_text("⚠️ Debes validarte primero. Escribe tu **cédula** o **correo**.")
+        await responder(query, "⚠️ Debes validarte primero. Escribe tu **cédula** o **correo**.")
         return
 
     data = query.data
+    catalogo = evento_actual().catalogo
 
     if data == "volver_menu_principal":
-        await query.edit_message_text("Menú principal:", reply_markup=principal_inline())
+        await responder(query, "Menú principal:", reply_markup=principal_inline())
         return
 
 
@@ -754,7 +1501,8 @@ async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Material de apoyo
     if data == "menu_material":
-        await query.edit_message_text(
+        await responder(
+            query,
             "📚 *Material de apoyo*\nElige un presentador:",
             reply_markup=presentadores_keyboard("mat_pres"),
             parse_mode="Markdown",
@@ -763,8 +1511,9 @@ async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if data.startswith("mat_pres:"):
         pid = data.split(":", 1)[1]
-        nombre = next((n for (i, n) in PRESENTADORES if i == pid), "Presentador")
-        await query.edit_message_text(
+        nombre = catalogo.nombre_presentador(pid)
+        await responder(
+            query,
             f"📚 *Material de {nombre}*",
             reply_markup=material_presentador_menu(pid),
             parse_mode="Markdown",
@@ -773,60 +1522,58 @@ async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if data.startswith("mat_videos_url:"):
         pid = data.split(":", 1)[1]
-        enlaces = VIDEO_LINKS.get(pid, {})
-        if not enlaces:
-            await query.edit_message_text("🎥 No hay videos por ahora.",
-                                          reply_markup=material_presentador_menu(pid))
+        videos = catalogo.materiales.get(pid, {}).get("videos", ())
+        if not catalogo.video_links.get(pid) and not videos:
+            await responder(query, "🎥 No hay videos por ahora.",
+                            reply_markup=material_presentador_menu(pid))
         else:
-            await query.edit_message_text("🎥 *Videos:*",
-                                          reply_markup=lista_video_links_inline(pid),
-                                          parse_mode="Markdown")
+            await responder(query, "🎥 *Videos:*",
+                            reply_markup=lista_video_links_inline(pid),
+                            parse_mode="Markdown")
         return
 
     if data.startswith("mat_docs:"):
         pid = data.split(":", 1)[1]
-        docs = MATERIALES.get(pid, {}).get("docs", {})
+        docs = catalogo.materiales.get(pid, {}).get("docs", ())
         if not docs:
-            await query.edit_message_text("📄 No hay documentos disponibles por ahora.",
-                                          reply_markup=material_presentador_menu(pid))
+            await responder(query, "📄 No hay documentos disponibles por ahora.",
+                            reply_markup=material_presentador_menu(pid))
         else:
-            await query.edit_message_text("📄 *Documentos:*",
-                                          reply_markup=lista_archivos_inline(docs, "doc", pid),
-                                          parse_mode="Markdown")
+            await responder(query, "📄 *Documentos:*",
+                            reply_markup=lista_archivos_inline(pid),
+                            parse_mode="Markdown")
         return
 
-    if data.startswith("doc:"):
-        _, pid, titulo = data.split(":", 2)
-        ruta = MATERIALES.get(pid, {}).get("docs", {}).get(titulo)
-        if ruta:
-            await envia_documento(update, context, ruta, titulo)
+    if data.startswith("d:"):
+        material = catalogo.archivos.get(data[2:])
+        if material:
+            await envia_documento(update, context, material.ruta, material.titulo)
         else:
-            await query.message.reply_text("No se encontró el documento solicitado.")
+            await responder(query, "No se encontró el documento solicitado.", reply_markup=principal_inline())
         return
 
     # Enlaces generales
     if data == "menu_enlaces":
-        await query.edit_message_text("🔗 *Enlaces y Conexión*",
-                                      reply_markup=enlaces_inline_general(),
-                                      parse_mode="Markdown")
+        await responder(query, "🔗 *Enlaces y Conexión*",
+                        reply_markup=enlaces_inline_general(),
+                        parse_mode="Markdown")
         return
 
     if data == "enlaces_conexion":
-        if not ENLACES_CONEXION:
-            await query.edit_message_text("🧩 Conexiones del evento:\n\n(Pronto publicaremos los enlaces)",
-                                          parse_mode="Markdown",
-                                          reply_markup=enlaces_inline_general())
+        if not catalogo.enlaces_conexion:
+            await responder(query, "🧩 Conexiones del evento:\n\n(Pronto publicaremos los enlaces)",
+                            parse_mode="Markdown",
+                            reply_markup=enlaces_inline_general())
             return
-        rows = [[InlineKeyboardButton(nombre, url=url)] for nombre, url in ENLACES_CONEXION.items()]
-        rows.append([InlineKeyboardButton("⬅️ Volver", callback_data="menu_enlaces")])
-        await query.edit_message_text("🧩 *Conexiones del evento (Zoom):*",
-                                      parse_mode="Markdown",
-                                      reply_markup=InlineKeyboardMarkup(rows))
+        await responder(query, "🧩 *Conexiones del evento (Zoom):*",
+                        parse_mode="Markdown",
+                        reply_markup=conexiones_inline())
         return
     
         # Enlaces por presentador (mostrar lista de presentadores)
     if data == "enlaces_por_presentador":
-        await query.edit_message_text(
+        await responder(
+            query,
             "⭐ *Elige un presentador:*",
             reply_markup=presentadores_keyboard("link_pres"),
             parse_mode="Markdown",
@@ -836,15 +1583,17 @@ async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if data.startswith("link_pres:"):
         pid = data.split(":", 1)[1]
-        nombre = next((n for (i, n) in PRESENTADORES if i == pid), "Presentador")
-        enlaces = ENLACES_POR_PRESENTADOR.get(pid, {})
+        nombre = catalogo.nombre_presentador(pid)
+        enlaces = catalogo.enlaces_por_presentador.get(pid, {})
         if not enlaces:
-            await query.edit_message_text(
+            await responder(
+                query,
                 f"⭐ *Enlaces de {nombre}*\n(No hay enlaces por ahora.)",
                 reply_markup=enlaces_presentador_lista(pid),
                 parse_mode="Markdown")
         else:
-            await query.edit_message_text(
+            await responder(
+                query,
                 f"⭐ *Enlaces de {nombre}*:",
                 reply_markup=enlaces_presentador_lista(pid),
                 parse_mode="Markdown")
@@ -867,7 +1616,7 @@ async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "2) Empieza a disfrutar de Exness.\n\n"
             "Usa los botones de abajo 👇"
         )
-        await query.edit_message_text(texto, parse_mode="Markdown", reply_markup=exness_inline())
+        await responder(query, texto, parse_mode="Markdown", reply_markup=exness_inline())
         return
 
     # Broadcast (por si cae aquí)
@@ -875,19 +1624,513 @@ async def menu_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await broadcast_start_cb(update, context)
         return
 
+# =========================
+# MÉTRICAS (llamadas a la API por interacción)
+# =========================
+@dataclass
+class Metricas:
+    inicio: float = field(default_factory=time.monotonic)
+    interacciones: Counter = field(default_factory=Counter)     # por tipo de interacción
+    llamadas: Counter = field(default_factory=Counter)          # por método de la Bot API
+    llamadas_por_tipo: Counter = field(default_factory=Counter) # llamadas atribuidas a cada tipo
+    reintentos: Counter = field(default_factory=Counter)        # por método de la Bot API
+
+METRICAS = Metricas()
+
+# Tipo de la interacción en curso; cada update corre en su propia tarea, así que
+# las llamadas salientes (incluidas las de en_segundo_plano) quedan atribuidas.
+_INTERACCION: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("interaccion", default=None)
+
+def tipo_interaccion(update: Update) -> str:
+    if update.callback_query:
+        data = update.callback_query.data or ""
+        return "cb:" + data.split(":", 1)[0]
+    msg = update.effective_message
+    if msg and msg.text:
+        return msg.text.split()[0].split("@")[0] if msg.text.startswith("/") else "texto"
+    return "media" if msg else "otro"
+
+async def contar_interaccion(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    tipo = tipo_interaccion(update)
+    _INTERACCION.set(tipo)
+    METRICAS.interacciones[tipo] += 1
+
+class HTTPXRequestMedido(HTTPXRequest):
+    """HTTPXRequest que cuenta cada llamada saliente por método y por interacción."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        METRICAS.llamadas[endpoint] += 1
+        tipo = _INTERACCION.get()
+        if tipo:
+            METRICAS.llamadas_por_tipo[tipo] += 1
+        return await super().do_request(url, method, *args, **kwargs)
+
+def resumen_metricas() -> str:
+    minutos = (time.monotonic() - METRICAS.inicio) / 60
+    total_int = sum(METRICAS.interacciones.values())
+    total_llam = sum(METRICAS.llamadas_por_tipo.values())
+    prom = total_llam / total_int if total_int else 0.0
+    lineas = [
+        f"📊 *Estadísticas* (últimos {minutos:.0f} min)",
+        f"• Interacciones: {total_int}",
+        f"• Llamadas a la API por interacción: {prom:.2f}",
+        "",
+        "*Por tipo* (interacciones → llamadas/interacción):",
+    ]
+    for tipo, n in METRICAS.interacciones.most_common(12):
+        lineas.append(f"• `{tipo}`: {n} → {METRICAS.llamadas_por_tipo[tipo] / n:.2f}")
+    lineas += ["", "*Métodos más usados:*"]
+    for endpoint, n in METRICAS.llamadas.most_common(8):
+        lineas.append(f"• `{endpoint}`: {n}")
+    if METRICAS.reintentos:
+        lineas += ["", "*Reintentos:*"]
+        for endpoint, n in METRICAS.reintentos.most_common(5):
+            lineas.append(f"• `{endpoint}`: {n}")
+    abiertos = [
+        e if len(CONTROL_SALIDA) == 1 else f"{EVENTO_DEL_TOKEN[t].id if t in EVENTO_DEL_TOKEN else 'bot'}/{e}"
+        for t, control in CONTROL_SALIDA.items()
+        for e, c in control.circuitos.items() if not c.permite()
+    ]
+    if abiertos:
+        lineas.append(f"🔌 Circuitos abiertos: {', '.join(abiertos)}")
+
+    lag = MONITOR_LOOP.percentiles()
+    if lag:
+        lineas += [
+            "",
+            f"*Lag del event loop* ({len(MONITOR_LOOP.muestras)} muestras, ms):",
+            f"• p50 {lag['p50']:.1f} · p95 {lag['p95']:.1f} · p99 {lag['p99']:.1f} · máx {lag['max']:.1f}",
+        ]
+    if MONITOR_LOOP.bloqueos:
+        lineas.append(f"*Bloqueos > {MONITOR_LOOP.umbral * 1000:.0f} ms:*")
+        for handler, n in MONITOR_LOOP.bloqueos.most_common(5):
+            lineas.append(f"• `{handler}`: {n}")
+    return "\n".join(lineas)
+
+# =========================
+# MONITOR DEL EVENT LOOP (lag y bloqueos)
+# =========================
+LOOP_LAG_INTERVALO = float(os.getenv("LOOP_LAG_INTERVALO_MS", "250")) / 1000
+LOOP_BLOQUEO_UMBRAL = float(os.getenv("LOOP_BLOQUEO_UMBRAL_MS", "300")) / 1000
+
+class MonitorLoop:
+    """Mide el lag del event loop y detecta callbacks que lo bloquean.
+
+    Una tarea duerme LOOP_LAG_INTERVALO y registra cuánto tarde despierta (lag).
+    Un hilo vigía revisa el latido de esa tarea: si el loop no responde en más de
+    LOOP_BLOQUEO_UMBRAL, toma la pila del hilo del loop y la registra junto con
+    el handler que aparece en ella.
+    """
+
+    def __init__(self, intervalo: float = LOOP_LAG_INTERVALO, umbral: float = LOOP_BLOQUEO_UMBRAL):
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.muestras: deque[float] = deque(maxlen=2400)
+        self.bloqueos: Counter = Counter()  # por handler
+        self.handlers: Dict[object, str] = {}  # code object -> nombre del handler
+        self._latido = time.monotonic()
+        self._hilo_loop = 0
+        self._tarea: asyncio.Task | None = None
+        self._detener = threading.Event()
+        self._vigia: threading.Thread | None = None
+
+    def registrar_handlers(self, callbacks) -> None:
+        for cb in callbacks:
+            code = getattr(cb, "__code__", None)
+            if code is not None:
+                self.handlers[code] = cb.__name__
+
+    def iniciar(self) -> None:
+        self._hilo_loop = threading.get_ident()
+        self._latido = time.monotonic()
+        self._tarea = asyncio.create_task(self._medir_lag())
+        self._vigia = threading.Thread(target=self._vigilar, name="vigia-loop", daemon=True)
+        self._vigia.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._tarea:
+            self._tarea.cancel()
+
+    async def _medir_lag(self) -> None:
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(self.intervalo)
+            ahora = time.monotonic()
+            self._latido = ahora
+            self.muestras.append(max(0.0, ahora - t0 - self.intervalo))
+
+    def _vigilar(self) -> None:
+        reportado = None
+        while not self._detener.wait(self.umbral / 2):
+            latido = self._latido
+            bloqueado = time.monotonic() - latido - self.intervalo
+            if bloqueado < self.umbral or reportado == latido:
+                continue
+            reportado = latido
+            frame = sys._current_frames().get(self._hilo_loop)
+            if frame is None:
+                continue
+            handler = self._handler_en(frame)
+            self.bloqueos[handler] += 1
+            log.warning(
+                "Event loop bloqueado %.0f ms en %s:\n%s",
+                bloqueado * 1000, handler, "".join(traceback.format_stack(frame)),
+            )
+
+    def _handler_en(self, frame) -> str:
+        while frame is not None:
+            nombre = self.handlers.get(frame.f_code)
+            if nombre:
+                return nombre
+            frame = frame.f_back
+        return "(fuera de un handler)"
+
+    def percentiles(self) -> Dict[str, float]:
+        datos = sorted(self.muestras)
+        if not datos:
+            return {}
+        def p(q: float) -> float:
+            return datos[min(len(datos) - 1, int(q * len(datos)))] * 1000
+        return {"p50": p(0.50), "p95": p(0.95), "p99": p(0.99), "max": datos[-1] * 1000}
+
+MONITOR_LOOP = MonitorLoop()
+
+# =========================
+# PERFILADO BAJO DEMANDA (/profile)
+# =========================
+# Nada queda instalado mientras no haya un /profile en curso: el costo es cero
+# cuando está apagado.
+PERFIL_MAX_SECS = int(os.getenv("PERFIL_MAX_SECS", "120"))
+PERFIL_INTERVALO_MUESTREO = 0.005
+_PERFIL_EN_CURSO = False
+
+class MuestreadorPilas(threading.Thread):
+    """Muestrea la pila del hilo del event loop y la acumula en formato "collapsed".
+
+    Cuando el loop está esperando en select() la muestra se marca como
+    "[loop inactivo]", así que el flamegraph separa tiempo ocioso de trabajo real.
+    """
+
+    def __init__(self, hilo_loop: int, intervalo: float = PERFIL_INTERVALO_MUESTREO):
+        super().__init__(name="muestreador-perfil", daemon=True)
+        self.hilo_loop = hilo_loop
+        self.intervalo = intervalo
+        self.pilas: Counter = Counter()
+        self._detener = threading.Event()
+
+    def run(self) -> None:
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_loop)
+            if frame is None:
+                continue
+            pila = []
+            while frame is not None:
+                code = frame.f_code
+                pila.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            pila.reverse()
+            if "selectors.py" in pila[-1]:
+                pila.append("[loop inactivo]")
+            self.pilas[";".join(pila)] += 1
+
+    def detener(self) -> None:
+        self._detener.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{pila} {n}\n" for pila, n in self.pilas.most_common())
+
+def _escribir_perfil(prof: cProfile.Profile, muestreador: MuestreadorPilas, destino: Path) -> Tuple[Path, Path, str]:
+    """Vuelca pstats + pilas colapsadas a disco y arma un top de funciones (bloqueante)."""
+    marca = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    ruta_pstats = destino / f"perfil-{marca}.pstats"
+    ruta_pilas = destino / f"perfil-{marca}.collapsed.txt"
+    prof.dump_stats(str(ruta_pstats))
+    ruta_pilas.write_text(muestreador.collapsed(), encoding="utf-8")
+
+    stats = pstats.Stats(str(ruta_pstats))
+    filas = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:8]
+    top = "\n".join(
+        f"• {func[2] if func[0] == '~' else f'{func[2]} ({Path(func[0]).name}:{func[1]})'} — {cum * 1000:.0f} ms"
+        for func, (_, _, _, cum, _) in filas
+    )
+    return ruta_pstats, ruta_pilas, top
+
+async def perfilar(update: Update, context: ContextTypes.DEFAULT_TYPE, segundos: int) -> None:
+    global _PERFIL_EN_CURSO
+    prof = cProfile.Profile()
+    muestreador = MuestreadorPilas(threading.get_ident())
+    try:
+        muestreador.start()
+        prof.enable()
+        await asyncio.sleep(segundos)
+    finally:
+        prof.disable()
+        muestreador.detener()
+        _PERFIL_EN_CURSO = False
+
+    destino = Path(tempfile.mkdtemp(prefix="perfil-"))
+    try:
+        ruta_pstats, ruta_pilas, top = await asyncio.to_thread(_escribir_perfil, prof, muestreador, destino)
+        await update.effective_message.reply_text(
+            f"🔬 Perfil de {segundos}s listo ({sum(muestreador.pilas.values())} muestras).\n\n"
+            f"Top por tiempo acumulado:\n{top}"
+        )
+        await envia_documento(update, context, ruta_pstats, "pstats (python -m pstats / snakeviz)")
+        await envia_documento(update, context, ruta_pilas, "Pilas colapsadas (flamegraph.pl / speedscope)")
+    finally:
+        shutil.rmtree(destino, ignore_errors=True)
+
+# =========================
+# REINTENTOS, RETRY-AFTER Y CIRCUIT BREAKER (toda llamada saliente)
+# =========================
+# Vive en el transporte (do_request), así que cubre cada reply_text,
+# edit_message_text, copy_message, etc. sin tocar los handlers.
+RETRY_MAX_INTENTOS = int(os.getenv("RETRY_MAX_INTENTOS", "4"))
+RETRY_BASE_SECS = 0.5
+RETRY_TOPE_SECS = 8.0
+RETRY_PRESUPUESTO = 0.2        # reintentos permitidos por llamada, en promedio
+RETRY_PRESUPUESTO_MAX = 20.0
+CIRCUITO_FALLOS = 5
+CIRCUITO_ENFRIAMIENTO_SECS = 30.0
+
+# Métodos que se pueden repetir aunque Telegram ya haya procesado el primer intento
+_IDEMPOTENTES = ("get", "answer", "edit", "delete", "set", "sendChatAction")
+
+@dataclass
+class Circuito:
+    fallos: int = 0
+    abierto_hasta: float = 0.0
+
+    def permite(self) -> bool:
+        # Pasado el enfriamiento queda "semiabierto": deja pasar llamadas de prueba
+        return time.monotonic() >= self.abierto_hasta
+
+    def exito(self) -> None:
+        self.fallos = 0
+
+    def fallo(self, endpoint: str) -> None:
+        self.fallos += 1
+        if self.fallos >= CIRCUITO_FALLOS and self.permite():
+            self.abierto_hasta = time.monotonic() + CIRCUITO_ENFRIAMIENTO_SECS
+            log.warning("Circuito abierto para %s por %.0fs tras %d fallos seguidos",
+                        endpoint, CIRCUITO_ENFRIAMIENTO_SECS, self.fallos)
+
+@dataclass
+class ControlSalida:
+    circuitos: Dict[str, Circuito] = field(default_factory=dict)
+    pausa_hasta: float = 0.0
+    presupuesto: float = RETRY_PRESUPUESTO_MAX
+
+    def circuito(self, endpoint: str) -> Circuito:
+        return self.circuitos.setdefault(endpoint, Circuito())
+
+    def depositar(self) -> None:
+        self.presupuesto = min(RETRY_PRESUPUESTO_MAX, self.presupuesto + RETRY_PRESUPUESTO)
+
+    def gastar(self) -> bool:
+        if self.presupuesto < 1:
+            return False
+        self.presupuesto -= 1
+        return True
+
+    def pausar(self, segundos: float) -> None:
+        self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + segundos)
+
+    async def esperar_pausa(self) -> None:
+        espera = self.pausa_hasta - time.monotonic()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+# Telegram limita cada token por separado: un 429 o un circuito abierto en el bot
+# de un evento no debe frenar a los bots de los demás eventos
+CONTROL_SALIDA: Dict[str, ControlSalida] = {}
+
+def control_salida(url: str) -> ControlSalida:
+    """Estado de salida del token de la URL (.../bot<token>/<método>)."""
+    token = url.rsplit("/", 2)[-2].removeprefix("bot")
+    return CONTROL_SALIDA.setdefault(token, ControlSalida())
+
+def _espera_backoff(intento: int) -> float:
+    # "Full jitter": evita que todos los reintentos caigan en el mismo instante
+    return random.uniform(0, min(RETRY_TOPE_SECS, RETRY_BASE_SECS * 2 ** intento))
+
+def _retry_after(cuerpo: bytes) -> float:
+    try:
+        return float(json.loads(cuerpo)["parameters"]["retry_after"])
+    except Exception:
+        return 1.0
+
+def _reintentable(endpoint: str, error: Optional[Exception]) -> bool:
+    # Un ReadTimeout o un 5xx (error=None) en un send* puede significar que el
+    # mensaje sí llegó: un 502/504 del frontend de Telegram puede llegar después
+    # de entregarlo, y repetirlo lo duplicaría. Los demás errores de red ocurren
+    # antes de que Telegram procese la llamada.
+    if endpoint.startswith(_IDEMPOTENTES):
+        return True
+    return error is not None and not isinstance(error.__cause__, httpx.ReadTimeout)
+
+class HTTPXRequestResiliente(HTTPXRequestMedido):
+    """Reintentos con backoff + jitter, pausa por token ante 429 y circuit breaker por token y método."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        control = control_salida(url)
+        circuito = control.circuito(endpoint)
+        if not circuito.permite():
+            raise NetworkError(f"Circuito abierto para {endpoint}; se reintentará más tarde.")
+        control.depositar()
+
+        intento = 0
+        while True:
+            await control.esperar_pausa()
+            error: Optional[Exception] = None
+            try:
+                codigo, cuerpo = await super().do_request(url, method, *args, **kwargs)
+            except (TimedOut, NetworkError) as e:
+                if isinstance(e.__cause__, httpx.PoolTimeout):
+                    # Pool local lleno: la llamada nunca salió. No es un fallo de Telegram
+                    # (no cuenta para el circuito) y reintentarla solo agrega carga al pool.
+                    raise
+                error = e
+            else:
+                if codigo == 429:
+                    # Telegram pide esperar: se pausa todo el tráfico de este token, no solo esta llamada
+                    control.pausar(_retry_after(cuerpo))
+                    if intento + 1 >= RETRY_MAX_INTENTOS:
+                        return codigo, cuerpo
+                    intento += 1
+                    METRICAS.reintentos[endpoint] += 1
+                    continue
+                if codigo < 500:
+                    circuito.exito()
+                    return codigo, cuerpo
+
+            circuito.fallo(endpoint)
+            intento += 1
+            puede = (
+                intento < RETRY_MAX_INTENTOS
+                and circuito.permite()
+                and _reintentable(endpoint, error)
+                and control.gastar()
+            )
+            if not puede:
+                if error:
+                    raise error
+                return codigo, cuerpo
+            METRICAS.reintentos[endpoint] += 1
+            await asyncio.sleep(_espera_backoff(intento))
+
+# =========================
+# HTTP SALIENTE (pools separados)
+# =========================
+def crear_request(pool: int, read_timeout: float, write_timeout: float,
+                  pool_timeout: float, media_write_timeout: float = 20.0,
+                  clase: type = HTTPXRequestResiliente) -> HTTPXRequest:
+    return clase(
+        connection_pool_size=pool,
+        connect_timeout=5.0,
+        read_timeout=read_timeout,
+        write_timeout=write_timeout,
+        pool_timeout=pool_timeout,
+        media_write_timeout=media_write_timeout,
+        httpx_kwargs={
+            "limits": httpx.Limits(
+                max_connections=pool,
+                max_keepalive_connections=pool,
+                keepalive_expiry=HTTP_KEEPALIVE_SECS,
+            ),
+        },
+    )
+
+def bot_cargas(context: ContextTypes.DEFAULT_TYPE) -> Bot:
+    """Bot para subir archivos (pool propio, timeouts largos)."""
+    return BOTS_CARGAS.get(context.bot.token) or context.bot
+
+def bot_difusion(context: ContextTypes.DEFAULT_TYPE) -> Bot:
+    """Bot para envíos masivos (pool propio)."""
+    return BOTS_DIFUSION.get(context.bot.token) or context.bot
+
 # =========================
 # ARRANQUE
 # =========================
-def build_app() -> Application:
-    if not BOT_TOKEN:
-        raise RuntimeError("Falta la variable de entorno BOT_TOKEN.")
+_TAREAS_PROCESO: list[asyncio.Task] = []
+_APPS_ACTIVAS = 0
+
+async def iniciar_proceso(app: Application) -> None:
+    """Lo compartido por todos los bots (DB, catálogos, check-ins, monitor); solo corre con la primera Application."""
+    global _APPS_ACTIVAS
+    _APPS_ACTIVAS += 1
+    if _APPS_ACTIVAS > 1:
+        return
+    await init_db()
+    if CATALOGO_WATCH_SECS > 0:
+        for ev in EVENTOS.values():
+            _TAREAS_PROCESO.append(asyncio.create_task(vigilar_catalogo(ev, CATALOGO_WATCH_SECS)))
+    MONITOR_LOOP.registrar_handlers(h.callback for hs in app.handlers.values() for h in hs)
+    await CHECKINS.sincronizar()
+    _TAREAS_PROCESO.append(asyncio.create_task(CHECKINS.escribir_lotes()))
+    if not CHECKIN_SECRET:
+        log.warning("CHECKIN_SECRET no está definido: no se emitirán QR de ingreso.")
+    log.info("Eventos activos: %s", ", ".join(f"{ev.id} ({ev.nombre})" for ev in EVENTOS.values()))
+    MONITOR_LOOP.iniciar()
+
+async def detener_proceso() -> None:
+    global _APPS_ACTIVAS
+    _APPS_ACTIVAS -= 1
+    if _APPS_ACTIVAS > 0:
+        return
+    MONITOR_LOOP.detener()
+    for t in _TAREAS_PROCESO:
+        t.cancel()
+    _TAREAS_PROCESO.clear()
+
+def build_apps() -> list[Application]:
+    """Una Application por token; todas comparten los clientes HTTP y el pool de PostgreSQL."""
+    sin_token = [ev.id for ev in EVENTOS.values() if not ev.token]
+    if sin_token:
+        raise RuntimeError(f"Falta el token del bot (BOT_TOKEN o token_env) para: {', '.join(sin_token)}")
+
+    # Respuestas interactivas: timeouts cortos, falla rápido si el pool está lleno
+    interactivo = crear_request(HTTP_POOL_INTERACTIVO, read_timeout=10.0, write_timeout=10.0, pool_timeout=2.0)
+    cargas = crear_request(
+        HTTP_POOL_CARGAS, read_timeout=120.0, write_timeout=120.0,
+        pool_timeout=30.0, media_write_timeout=300.0,
+    )
+    difusion = crear_request(HTTP_POOL_DIFUSION, read_timeout=15.0, write_timeout=15.0, pool_timeout=10.0)
+    return [build_app(token, interactivo, cargas, difusion) for token in EVENTO_DEL_TOKEN]
 
-    async def _post_init(app: Application):
-        await init_db()
-        global BASE_LOCAL
-        BASE_LOCAL = cargar_base_local()
+def build_app(token: str, interactivo: HTTPXRequest, cargas: HTTPXRequest, difusion: HTTPXRequest) -> Application:
+    # Mismo token, distinto cliente HTTP: cada Bot usa el pool de su tipo de tráfico
+    BOTS_CARGAS[token] = Bot(token, request=cargas)
+    BOTS_DIFUSION[token] = Bot(token, request=difusion)
 
-    app = Application.builder().token(BOT_TOKEN).post_init(_post_init).build()
+    async def _post_init(app: Application):
+        await BOTS_CARGAS[token].initialize()
+        await BOTS_DIFUSION[token].initialize()
+        await iniciar_proceso(app)
+
+    async def _post_shutdown(app: Application):
+        await detener_proceso()
+        await BOTS_CARGAS[token].shutdown()
+        await BOTS_DIFUSION[token].shutdown()
+
+    app = (
+        Application.builder()
+        .token(token)
+        .request(interactivo)
+        # getUpdates es long-polling: una conexión dedicada que no compite con nadie
+        # (sin capa de reintentos: el Updater de PTB ya reintenta getUpdates por su cuenta)
+        .get_updates_request(crear_request(1, read_timeout=30.0, write_timeout=10.0, pool_timeout=5.0,
+                                           clase=HTTPXRequestMedido))
+        # Una subida o un envío masivo en curso no debe bloquear al resto de usuarios
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     # Handlers
     app.add_handler(CommandHandler("start", start))
@@ -900,6 +2143,20 @@ def build_app() -> Application:
     app.add_handler(CommandHandler("cancel", broadcast_cancel))
     app.add_handler(CallbackQueryHandler(broadcast_start_cb, pattern="^admin_broadcast$"))
 
+    # Catálogo de contenido y estadísticas
+    app.add_handler(CommandHandler("reload", reload_cmd))
+    app.add_handler(CommandHandler("stats", stats_cmd))
+    app.add_handler(CommandHandler("profile", profile_cmd))
+    app.add_handler(CommandHandler("export", export_cmd))
+
+    # Check-in en la puerta
+    app.add_handler(CommandHandler("checkin", checkin_cmd))
+    app.add_handler(CommandHandler("qr", qr_cmd))
+
+    # Evento del update (grupo -2) y métricas (grupo -1): corren antes que cualquier otro handler
+    app.add_handler(TypeHandler(Update, fijar_evento), group=-2)
+    app.add_handler(TypeHandler(Update, contar_interaccion), group=-1)
+
     # Broadcast de medios / no-texto (debe ir ANTES del handler de texto)
     app.add_handler(MessageHandler((~filters.COMMAND) & (~filters.TEXT), maybe_broadcast_any))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_ingreso_o_menu))
@@ -908,16 +2165,80 @@ def build_app() -> Application:
     return app
 
 
-if __name__ == "__main__":
-    application = build_app()
+class WebhookVariosBots(tornado.web.RequestHandler):
+    """POST /webhook/<token>: entrega el update a la Application de ese token."""
+
+    def initialize(self, apps: Dict[str, Application]) -> None:
+        self.apps = apps
+
+    async def post(self, token: str) -> None:
+        app = self.apps.get(token)
+        if app is None:
+            self.set_status(404)
+            return
+        try:
+            update = Update.de_json(json.loads(self.request.body), app.bot)
+        except ValueError:
+            self.set_status(400)
+            return
+        await app.update_queue.put(update)
 
-    if USE_WEBHOOK and WEBHOOK_URL:
+
+async def correr_varios(apps: list[Application]) -> None:
+    """run_polling/run_webhook manejan una sola Application; con varios tokens se arrancan a mano."""
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, detener.set)
+
+    servidor = None
+    try:
+        for app in apps:
+            await app.initialize()
+            await app.post_init(app)
+        if USE_WEBHOOK and WEBHOOK_HOST:
+            # Un solo puerto para todos los bots, enrutado por el token en la ruta
+            rutas = {app.bot.token: app for app in apps}
+            servidor = tornado.httpserver.HTTPServer(tornado.web.Application(
+                [(r"/webhook/([^/]+)", WebhookVariosBots, {"apps": rutas})]
+            ))
+            servidor.listen(PORT, "0.0.0.0")
+            for app in apps:
+                await app.bot.set_webhook(url=f"{WEBHOOK_HOST}/webhook/{app.bot.token}")
+        else:
+            for app in apps:
+                await app.updater.start_polling(drop_pending_updates=True)
+        for app in apps:
+            await app.start()
+        await detener.wait()
+    finally:
+        if servidor:
+            servidor.stop()
+        for app in apps:
+            if app.updater.running:
+                await app.updater.stop()
+            if app.running:
+                await app.stop()
+        for app in apps:
+            await app.shutdown()
+            await app.post_shutdown(app)
+
+
+if __name__ == "__main__":
+    aplicaciones = build_apps()
+
+    if len(aplicaciones) > 1:
+        print(f"Iniciando {len(aplicaciones)} bots ({len(EVENTOS)} eventos) en un solo proceso.")
+        asyncio.run(correr_varios(aplicaciones))
+    elif USE_WEBHOOK and WEBHOOK_HOST:
+        application = aplicaciones[0]
+        webhook_path = f"/webhook/{application.bot.token}"
         application.run_webhook(
             listen="0.0.0.0",
             port=PORT,
-            url_path=WEBHOOK_PATH,
-            webhook_url=WEBHOOK_URL,
+            url_path=webhook_path,
+            webhook_url=f"{WEBHOOK_HOST}{webhook_path}",
         )
     else:
         print("Iniciando en modo polling. Establece USE_WEBHOOK=true y WEBHOOK_HOST=https://<...> para prod.")
-        application.run_polling(drop_pending_updates=True)
+        aplicaciones[0].run_polling(drop_pending_updates=True)
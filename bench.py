@@ -0,0 +1,280 @@
+"""Microbenchmarks de las funciones calientes de app.py.
+
+Corre sin Telegram ni PostgreSQL: el bot usa un request falso que responde al
+instante y las escrituras a la base se reemplazan por no-ops.
+
+Uso:
+    python bench.py                          # escribe bench_results.json
+    python bench.py --rapido                 # solo roster de 1k (para CI)
+    python bench.py --baseline anterior.json # falla si algo es >25% más lento
+
+Sale con código 1 si algún resultado supera su techo en bench_thresholds.json
+o empeora más de --tolerancia respecto al baseline.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+os.environ.setdefault("CATALOGO_WATCH_SECS", "0")
+
+import app  # noqa: E402
+from telegram import Bot, Update  # noqa: E402
+from telegram.ext import CallbackContext  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+RAIZ = Path(__file__).parent
+UMBRALES_JSON = RAIZ / "bench_thresholds.json"
+
+RESULTADOS: dict[str, dict] = {}
+
+
+# =========================
+# HARNESS
+# =========================
+def _calibrar(fn, objetivo: float = 0.05) -> int:
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        if time.perf_counter() - t0 >= objetivo or n >= 1_000_000:
+            return n
+        n *= 4
+
+
+def medir(nombre: str, fn, rondas: int = 5) -> None:
+    n = _calibrar(fn)
+    tiempos = []
+    for _ in range(rondas):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        tiempos.append((time.perf_counter() - t0) / n)
+    _registrar(nombre, tiempos, n)
+
+
+async def medir_async(nombre: str, fn, n: int = 200, rondas: int = 5) -> None:
+    tiempos = []
+    for _ in range(rondas):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await fn()
+        tiempos.append((time.perf_counter() - t0) / n)
+    _registrar(nombre, tiempos, n)
+
+
+def _registrar(nombre: str, tiempos: list[float], n: int) -> None:
+    RESULTADOS[nombre] = {
+        "us_por_op": round(statistics.median(tiempos) * 1e6, 3),
+        "us_min": round(min(tiempos) * 1e6, 3),
+        "iteraciones": n,
+        "rondas": len(tiempos),
+    }
+    print(f"{nombre:<45} {RESULTADOS[nombre]['us_por_op']:>12.3f} µs/op")
+
+
+# =========================
+# DATOS SINTÉTICOS
+# =========================
+def roster_sintetico(n: int) -> dict[str, str]:
+    """n asistentes, cada uno con cédula y correo (2n claves), como usuarios.json."""
+    base = {}
+    for i in range(n):
+        nombre = f"Asistente {i} Apellido{i % 97}"
+        base[str(10_000_000 + i)] = nombre
+        base[f"asistente{i}@correo.com"] = nombre
+    return base
+
+
+# =========================
+# BOT FALSO
+# =========================
+_MSG = {"message_id": 1, "date": 0, "chat": {"id": 42, "type": "private"}, "text": "menu"}
+_BOT_USER = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bench_bot"}
+_USER = {"id": 42, "is_bot": False, "first_name": "Bench"}
+
+
+class RequestFalso(BaseRequest):
+    """Responde cualquier método de la Bot API sin tocar la red."""
+
+    read_timeout = 5.0
+    _OK_MSG = json.dumps({"ok": True, "result": _MSG}).encode()
+    _OK_TRUE = json.dumps({"ok": True, "result": True}).encode()
+    _OK_ME = json.dumps({"ok": True, "result": _BOT_USER}).encode()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        if endpoint == "getMe":
+            return 200, self._OK_ME
+        if endpoint in ("answerCallbackQuery", "sendChatAction"):
+            return 200, self._OK_TRUE
+        return 200, self._OK_MSG
+
+
+# =========================
+# BENCHMARKS
+# =========================
+def bench_roster(tamanos: list[int]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in tamanos:
+            roster = roster_sintetico(n)
+            ruta = Path(tmp) / f"usuarios_{n}.json"
+            ruta.write_text(json.dumps(roster, ensure_ascii=False), encoding="utf-8")
+
+            medir(f"cargar_base_local[{n}]", lambda: app.cargar_base_local(ruta), rondas=3)
+            base = app.cargar_base_local(ruta)
+            medir(f"indexar_roster[{n}]", lambda: app.indexar_roster(base), rondas=3)
+
+            indice = app.indexar_roster(base)
+            medio = n // 2
+            medir(f"buscar_en_base[{n}] cedula", lambda: app.buscar_en_base(str(10_000_000 + medio), indice))
+            medir(f"buscar_en_base[{n}] correo",
+                  lambda: app.buscar_en_base(f"Asistente{medio}@correo.com ", indice))
+            medir(f"buscar_en_base[{n}] inexistente", lambda: app.buscar_en_base("no-existe@correo.com", indice))
+
+
+def bench_texto() -> None:
+    medir("normaliza", lambda: app.normaliza("  Persona.Registrada@Correo.COM "))
+    medir("es_cedula", lambda: app.es_cedula("1.040.181 974"))
+    medir("es_cedula (correo)", lambda: app.es_cedula("persona@correo.com"))
+
+
+def bench_teclados() -> None:
+    catalogo = app.EVENTO_POR_DEFECTO.catalogo
+    pid = catalogo.presentadores[0][0] if catalogo.presentadores else "p1"
+    medir("principal_inline", app.principal_inline)
+    medir("presentadores_keyboard", lambda: app.presentadores_keyboard("mat_pres"))
+    medir("material_presentador_menu", lambda: app.material_presentador_menu(pid))
+    medir("lista_archivos_inline", lambda: app.lista_archivos_inline(pid))
+    medir("lista_video_links_inline", lambda: app.lista_video_links_inline(pid))
+    medir("enlaces_inline_general", app.enlaces_inline_general)
+    medir("enlaces_presentador_lista", lambda: app.enlaces_presentador_lista(pid))
+    medir("conexiones_inline", app.conexiones_inline)
+    medir("ubicacion_inline", app.ubicacion_inline)
+    medir("exness_inline", app.exness_inline)
+    medir("wifi_inline", app.wifi_inline)
+    medir("bottom_keyboard", app.bottom_keyboard)
+    raw = json.loads(app.EVENTO_POR_DEFECTO.catalogo_json.read_text(encoding="utf-8"))
+    medir("compilar_catalogo", lambda: app.compilar_catalogo(raw), rondas=3)
+
+
+def bench_prelanzamiento() -> None:
+    evento = app.EVENTO_POR_DEFECTO
+    original = evento.launch_date
+    casos = {
+        "sin fecha": "",
+        "antes": (datetime.now(timezone.utc) + timedelta(days=30)).strftime("%Y-%m-%d"),
+        "habilitado": (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d"),
+    }
+    for caso, fecha in casos.items():
+        evento.launch_date = fecha
+        medir(f"esta_en_prelanzamiento ({caso})", lambda: app.esta_en_prelanzamiento(evento))
+    evento.launch_date = original
+
+
+async def bench_menu_callbacks() -> None:
+    async def _sin_db(*args, **kwargs):
+        return None
+
+    app.upsert_user_seen = _sin_db
+    evento = app.EVENTO_POR_DEFECTO
+    app.PERFILES[(evento.id, _USER["id"])] = app.PerfilUsuario(nombre="Bench", autenticado=True)
+    original_fecha, evento.launch_date = evento.launch_date, ""
+
+    bot = Bot("123:bench", request=RequestFalso())
+    await bot.initialize()
+    application = app.Application.builder().bot(bot).build()
+
+    pid = evento.catalogo.presentadores[0][0] if evento.catalogo.presentadores else "p1"
+    rutas = [
+        "volver_menu_principal", "menu_material", f"mat_pres:{pid}", f"mat_videos_url:{pid}",
+        f"mat_docs:{pid}", "menu_enlaces", "enlaces_conexion", "enlaces_por_presentador",
+        f"link_pres:{pid}", "menu_ubicacion", "menu_wifi", "menu_exness", "d:inexistente",
+    ]
+    for data in rutas:
+        update = Update.de_json({
+            "update_id": 1,
+            "callback_query": {
+                "id": "1", "from": _USER, "chat_instance": "c", "data": data,
+                "message": {**_MSG, "from": _BOT_USER},
+            },
+        }, bot)
+        contexto = CallbackContext.from_update(update, application)
+
+        async def _una(update=update, contexto=contexto):
+            await app.menu_callbacks(update, contexto)
+
+        await medir_async(f"menu_callbacks[{data.split(':')[0]}]", _una)
+    await asyncio.sleep(0)  # deja terminar los answer() en segundo plano
+    await bot.shutdown()
+    evento.launch_date = original_fecha
+
+
+# =========================
+# REGRESIONES
+# =========================
+def revisar(umbrales: dict, baseline: dict | None, tolerancia: float) -> list[str]:
+    fallas = []
+    for nombre, r in RESULTADOS.items():
+        techo = umbrales.get(nombre)
+        if techo is not None and r["us_por_op"] > techo:
+            fallas.append(f"{nombre}: {r['us_por_op']:.1f} µs > techo {techo} µs")
+        # Contra el baseline se compara el mínimo: es mucho menos ruidoso que la mediana
+        previo = (baseline or {}).get(nombre)
+        if previo and r["us_min"] > previo["us_min"] * (1 + tolerancia):
+            fallas.append(
+                f"{nombre}: {r['us_min']:.1f} µs vs {previo['us_min']:.1f} µs del baseline "
+                f"(+{r['us_min'] / previo['us_min'] - 1:.0%})"
+            )
+    return fallas
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salida", default="bench_results.json")
+    parser.add_argument("--baseline", help="resultados previos (JSON de este script) para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--rapido", action="store_true", help="solo roster de 1k")
+    args = parser.parse_args()
+
+    tamanos = [1_000] if args.rapido else [1_000, 10_000, 100_000]
+    bench_texto()
+    bench_roster(tamanos)
+    bench_teclados()
+    bench_prelanzamiento()
+    asyncio.run(bench_menu_callbacks())
+
+    Path(args.salida).write_text(json.dumps({
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": RESULTADOS,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados en {args.salida}")
+
+    umbrales = json.loads(UMBRALES_JSON.read_text(encoding="utf-8")) if UMBRALES_JSON.exists() else {}
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["resultados"]
+    fallas = revisar(umbrales, baseline, args.tolerancia)
+    for f in fallas:
+        print(f"❌ {f}")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import app
+
+
+def test_token_ida_y_vuelta(monkeypatch):
+    monkeypatch.setattr(app, "CHECKIN_SECRET", b"secreto")
+    token = app.emitir_token_checkin("bogota", 42, "1.040.181")
+    assert app.verificar_token_checkin("bogota", token) == (42, "1040181")
+    assert app.verificar_token_checkin("bogota", f"https://t.me/bot?start=ci_{token}") == (42, "1040181")
+
+
+def test_token_alterado_o_de_otro_evento(monkeypatch):
+    monkeypatch.setattr(app, "CHECKIN_SECRET", b"secreto")
+    token = app.emitir_token_checkin("bogota", 42, "1040181")
+    alterado = ("B" if token[0] != "B" else "C") + token[1:]
+    assert app.verificar_token_checkin("bogota", alterado) is None
+    assert app.verificar_token_checkin("medellin", token) is None
+    assert app.verificar_token_checkin("bogota", "basura") is None
+
+
+def test_sin_secreto_se_rechaza_todo(monkeypatch):
+    monkeypatch.setattr(app, "CHECKIN_SECRET", b"")
+    token = app.emitir_token_checkin("bogota", 999, "123456")
+    assert app.verificar_token_checkin("bogota", token) is None
+
+
+def test_cedula_con_ceros_y_larga(monkeypatch):
+    monkeypatch.setattr(app, "CHECKIN_SECRET", b"secreto")
+    token = app.emitir_token_checkin("bogota", 42, "0012345")
+    assert app.verificar_token_checkin("bogota", token) == (42, "0012345")
+    assert len("ci_" + app.emitir_token_checkin("bogota", 2**63, "9" * 20)) <= 64
+    assert app.verificar_token_checkin("bogota", app.emitir_token_checkin("bogota", 42, "9" * 30)) == (42, None)
+    assert app.verificar_token_checkin("bogota", app.emitir_token_checkin("bogota", 42, None)) == (42, None)
+
+
+def test_cedula_con_puntos_coincide_con_el_roster(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "CHECKIN_SECRET", b"secreto")
+    ruta = tmp_path / "usuarios.json"
+    ruta.write_text('{"1.040.181": "Ana Uno"}', encoding="utf-8")
+    roster = app.indexar_roster(app.cargar_base_local(ruta))
+    assert app.buscar_en_base("1 040 181", roster)[0] == "Ana Uno"
+    _, cedula = app.verificar_token_checkin("bogota", app.emitir_token_checkin("bogota", 42, "1.040.181"))
+    assert roster.claves.get(app.normaliza(cedula)) == "Ana Uno"